@@ -0,0 +1,33 @@
+# File: cs412/object_cache.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Cache of pages and fragments rendered from one object, keyed on
+# a version read from the database, shared by the apps in this project
+
+from django.core.cache import cache
+
+# rendered entries are unreachable once a version changes, so this only
+# bounds how long dead entries take up room
+OBJECT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def cached_for_object(model, pk, name, version, render):
+    """Get something rendered from one object, rendering it again once its version changes.
+
+    The version comes from the database rather than from the cache, because
+    the default cache is per process: a stamp bumped by an import command
+    or by another web worker would never reach this process's cache, but a
+    database row is seen by all of them.
+    Args: model - model class the object belongs to
+          pk - primary key of the object
+          name - what is cached, such as 'detail_page'
+          version - database value that changes whenever the rendering would
+          render - function called with no arguments on a miss
+    Returns: the rendered value
+    """
+    key = f'object_cache:{name}:{model._meta.label_lower}:{pk}:{version}'
+    value = cache.get(key)
+    if value is None:
+        value = render()
+        cache.set(key, value, OBJECT_CACHE_TIMEOUT)
+    return value
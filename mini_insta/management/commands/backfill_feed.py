@@ -0,0 +1,18 @@
+# Jack Lee
+# jacklee@bu.edu
+# backfill_feed.py for mini_insta app - rebuilds the materialized post feeds
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mini_insta.models import rebuild_feeds
+
+
+class Command(BaseCommand):
+    """Rebuild every FeedItem row from the Follow and Post tables."""
+    help = 'Rebuild the materialized post feed of every profile.'
+
+    def handle(self, *args, **options):
+        """Run the rebuild in one transaction so feeds are never half empty."""
+        with transaction.atomic():
+            total = rebuild_feeds()
+        self.stdout.write(f"Wrote {total} feed items.")
@@ -0,0 +1,32 @@
+# Jack Lee
+# jacklee@bu.edu
+# make_thumbnails.py for mini_insta app - makes resized copies of photos
+# uploaded before the thumbnail pipeline, or all of them again
+
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from mini_insta.models import Photo
+from mini_insta.thumbnails import THUMBNAIL_WORKERS, make_variants_in_worker
+
+
+class Command(BaseCommand):
+    """Make the resized copies of uploaded photos on a pool of threads."""
+    help = 'Make resized copies of uploaded photos that do not have them yet.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--all', action='store_true',
+                            help='remake the copies of every uploaded photo')
+        parser.add_argument('--workers', type=int, default=THUMBNAIL_WORKERS,
+                            help='photos resized at the same time')
+
+    def handle(self, *args, **options):
+        """Resize the photos and report how many were done."""
+        photos = Photo.objects.exclude(image_file='')
+        if not options['all']:
+            photos = photos.filter(variants={})
+        photo_ids = list(photos.values_list('pk', flat=True))
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            done = sum(1 for variants in pool.map(make_variants_in_worker, photo_ids) if variants)
+        self.stdout.write(f"Made resized copies of {done} of {len(photo_ids)} photos.")
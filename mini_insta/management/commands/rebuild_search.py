@@ -0,0 +1,19 @@
+# Jack Lee
+# jacklee@bu.edu
+# rebuild_search.py for mini_insta app - refills the post and profile search index
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mini_insta.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Rebuild the FTS5 search tables from the Post and Profile tables."""
+    help = 'Rebuild the full-text search index of posts and profiles.'
+
+    def handle(self, *args, **options):
+        """Run the rebuild in one transaction so searches never see an empty index."""
+        with transaction.atomic():
+            indexed = rebuild_search_index()
+        for model, rows in indexed.items():
+            self.stdout.write(f"Indexed {rows} {model} rows.")
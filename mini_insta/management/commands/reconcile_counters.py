@@ -0,0 +1,19 @@
+# Jack Lee
+# jacklee@bu.edu
+# reconcile_counters.py for mini_insta app - repairs drifted counter columns
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mini_insta.models import reconcile_counters
+
+
+class Command(BaseCommand):
+    """Recount follower, following, post and like counts from the source tables."""
+    help = 'Recount the denormalized counters and fix any that have drifted.'
+
+    def handle(self, *args, **options):
+        """Run the recount in one transaction and report what was repaired."""
+        with transaction.atomic():
+            repaired = reconcile_counters()
+        for model, rows in repaired.items():
+            self.stdout.write(f"Repaired {rows} {model} rows.")
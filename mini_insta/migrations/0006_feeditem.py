@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_feeds(apps, schema_editor):
+    """Fill the feed of every existing follower."""
+    Follow = apps.get_model('mini_insta', 'Follow')
+    Post = apps.get_model('mini_insta', 'Post')
+    FeedItem = apps.get_model('mini_insta', 'FeedItem')
+    for viewer_id, profile_id in Follow.objects.values_list('follower_profile_id', 'profile_id'):
+        FeedItem.objects.bulk_create(
+            [FeedItem(viewer_id=viewer_id, post_id=pk, timestamp=timestamp)
+             for pk, timestamp in Post.objects.filter(profile_id=profile_id)
+                                              .values_list('pk', 'timestamp')],
+            batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0005_profile_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='mini_insta.post')),
+                ('viewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='mini_insta.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['viewer', '-timestamp', '-post'], name='feed_viewer_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('viewer', 'post'), name='feed_viewer_post_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
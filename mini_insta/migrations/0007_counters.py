@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """Count the follows, posts and likes that already exist."""
+    Profile = apps.get_model('mini_insta', 'Profile')
+    Post = apps.get_model('mini_insta', 'Post')
+    profiles = list(Profile.objects.annotate(
+        followers=Count('profile', distinct=True),
+        following=Count('follower_profile', distinct=True),
+        posts=Count('post', distinct=True)))
+    for profile in profiles:
+        profile.follower_count = profile.followers
+        profile.following_count = profile.following
+        profile.post_count = profile.posts
+    Profile.objects.bulk_update(profiles, ['follower_count', 'following_count', 'post_count'],
+                                batch_size=1000)
+    posts = list(Post.objects.annotate(likes=Count('like')))
+    for post in posts:
+        post.like_count = post.likes
+    Post.objects.bulk_update(posts, ['like_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0006_feeditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='page_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
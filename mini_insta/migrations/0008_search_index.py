@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0007_counters'),
+    ]
+
+    operations = [
+        # FTS5 tables keyed by post and profile id, with prefix indexes for
+        # matching words as they are typed
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE mini_insta_post_fts USING fts5("
+                "caption, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+                "INSERT INTO mini_insta_post_fts (rowid, caption) "
+                "SELECT id, caption FROM mini_insta_post",
+            ],
+            reverse_sql="DROP TABLE mini_insta_post_fts",
+        ),
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE mini_insta_profile_fts USING fts5("
+                "username, display_name, bio_text, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+                "INSERT INTO mini_insta_profile_fts (rowid, username, display_name, bio_text) "
+                "SELECT id, username, display_name, bio_text FROM mini_insta_profile",
+            ],
+            reverse_sql="DROP TABLE mini_insta_profile_fts",
+        ),
+    ]
@@ -3,13 +3,34 @@
 # models.py for mini_insta app - defines Profile, Post, and Photo models
 
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime
 from django.contrib.auth.models import User
 
 # Create your models here.
 
-class Profile(models.Model):
+class MaintainedColumnsModel(models.Model):
+    """Abstract model whose save() leaves its maintained_fields alone.
+    Counter and version columns are only changed by UPDATE ... SET x = x + 1
+    statements, so writing back an instance's stale copy of them would undo
+    changes made since it was loaded.
+    """
+    maintained_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Save the object, writing every column except the maintained ones once it exists."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key
+                                       and field.name not in self.maintained_fields]
+        super().save(*args, **kwargs)
+
+class Profile(MaintainedColumnsModel):
     """Model representing a user profile in mini_insta."""
     # link each profile to a django user for authentication
     user = models.ForeignKey(User, on_delete=models.CASCADE, default=1)
@@ -19,6 +40,17 @@ class Profile(models.Model):
     display_name = models.CharField(max_length=100)
     join_date = models.DateTimeField(auto_now_add=True)
 
+    # denormalized counts, kept current by signals.py and repaired by the
+    # reconcile_counters command
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    post_count = models.PositiveIntegerField(default=0)
+
+    # version of the cached profile page, raised with an UPDATE whenever it
+    # would change; kept in the database so every process sees it
+    page_version = models.PositiveIntegerField(default=0)
+    maintained_fields = ('follower_count', 'following_count', 'post_count', 'page_version')
+
     def __str__(self):
         """Return string representation of the profile."""
         return self.username
@@ -53,8 +85,8 @@ class Profile(models.Model):
         """Get count of followers.
         Returns: integer count
         """
-        # count how many people follow this profile
-        return Follow.objects.filter(profile=self).count()
+        # read the counter column instead of counting Follow rows
+        return self.follower_count
 
     def get_following(self):
         """Get list of profiles this profile follows.
@@ -70,17 +102,28 @@ class Profile(models.Model):
         """Get count of profiles being followed.
         Returns: integer count
         """
-        # count how many profiles this one follows
-        return Follow.objects.filter(follower_profile=self).count()
+        # read the counter column instead of counting Follow rows
+        return self.following_count
 
-    def get_post_feed(self):
+    def get_post_feed(self, before=None):
         """Get post feed for this profile.
+        Reads this profile's materialized timeline of FeedItem rows, which is
+        one range scan over feed_viewer_time_idx however many profiles it follows.
+        Args: before - optional (timestamp, post id) of a feed entry; only
+              older entries are returned, so pages can seek instead of OFFSET
         Returns: QuerySet of Post objects
         """
-        # get profiles this user follows
-        following_profiles = self.get_following()
-        # get posts from those profiles, ordered by most recent
-        posts = Post.objects.filter(profile__in=following_profiles).order_by('-timestamp')
+        in_feed = Q(feed_items__viewer=self)
+        if before is not None:
+            timestamp, post_id = before
+            # every condition on the FeedItem row goes in one filter() call,
+            # since separate calls would each join a different row
+            in_feed &= Q(feed_items__timestamp__lte=timestamp) & (
+                Q(feed_items__timestamp__lt=timestamp) |
+                Q(feed_items__timestamp=timestamp, feed_items__post_id__lt=post_id))
+        # newest first, with the post id breaking timestamp ties
+        posts = Post.objects.filter(in_feed).order_by(
+            '-feed_items__timestamp', '-feed_items__post_id')
         return posts
 
     def is_following(self, other_profile):
@@ -90,12 +133,53 @@ class Profile(models.Model):
         # check if a follow relationship exists
         return Follow.objects.filter(profile=other_profile, follower_profile=self).exists()
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    """QuerySet for posts, with the annotations post lists need."""
+
+    def with_summary(self, viewer=None):
+        """Annotate each post with what a post card shows, in the same query.
+        Adds cover_image_url, cover_image_file and cover_variants (from the first photo),
+        photo_count, comment_count and liked_by_viewer, and joins the author.
+        Likes are already counted in the like_count column.
+        Args: viewer - Profile looking at the posts, or None if logged out
+        Returns: QuerySet of Post objects
+        """
+        first_photo = Photo.objects.filter(post=OuterRef('pk')).order_by('timestamp', 'pk')
+        if viewer is None:
+            liked = Value(False)
+        else:
+            liked = Exists(Like.objects.filter(post=OuterRef('pk'), profile=viewer))
+        return self.select_related('profile').annotate(
+            cover_image_url=Subquery(first_photo.values('image_url')[:1]),
+            cover_image_file=Subquery(first_photo.values('image_file')[:1]),
+            cover_variants=Subquery(first_photo.values('variants')[:1]),
+            photo_count=count_subquery(Photo, 'post'),
+            comment_count=count_subquery(Comment, 'post'),
+            liked_by_viewer=liked,
+        )
+
+    def with_first_comment(self):
+        """Annotate each post with the text and author name of its first comment.
+        Returns: QuerySet of Post objects
+        """
+        first_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('timestamp', 'pk')
+        return self.annotate(
+            first_comment_text=Subquery(first_comment.values('text')[:1]),
+            first_comment_author=Subquery(first_comment.values('profile__display_name')[:1]),
+        )
+
+class Post(MaintainedColumnsModel):
     """Model representing a post by a profile."""
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now_add=True)
     caption = models.TextField(blank=True)
 
+    # denormalized count, kept current by signals.py
+    like_count = models.PositiveIntegerField(default=0)
+    maintained_fields = ('like_count',)
+
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         """Return string representation of the post."""
         return f"Post by {self.profile.username} at {self.timestamp}"
@@ -108,6 +192,33 @@ class Post(models.Model):
         photos = Photo.objects.filter(post=self).order_by('timestamp')
         return photos
 
+    def get_cover_photo(self):
+        """Get the post's first photo.
+        Uses the with_summary annotations when present, and queries otherwise.
+        Returns: Photo object (unsaved when built from annotations) or None
+        """
+        if not hasattr(self, 'cover_image_url'):
+            return self.get_all_photos().first()
+        if self.cover_image_url is None:
+            return None
+        return Photo(post=self, image_url=self.cover_image_url,
+                     image_file=self.cover_image_file, variants=self.cover_variants or {})
+
+    def get_cover_url(self, width=None):
+        """Get the image URL of the post's first photo.
+        Args: width - optional width in pixels the image is shown at
+        Returns: URL string, empty if the post has no photos
+        """
+        cover = self.get_cover_photo()
+        return cover.get_image_url(width) if cover else ""
+
+    def get_cover_srcset(self):
+        """Get the srcset of the post's first photo.
+        Returns: srcset string, empty if there are no resized copies
+        """
+        cover = self.get_cover_photo()
+        return cover.get_srcset() if cover else ""
+
     def get_absolute_url(self):
         """Get the URL for this post.
         Returns: URL string
@@ -145,6 +256,9 @@ class Photo(models.Model):
     image_url = models.URLField(max_length=500, blank=True)
     image_file = models.ImageField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # resized copies of image_file by width, e.g. {"320": "variants/7/320.webp"},
+    # written in the background by thumbnails.py
+    variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         """Return string representation of the photo."""
@@ -154,18 +268,28 @@ class Photo(models.Model):
         else:
             return f"Photo (url) for post {self.post.id}"
 
-    def get_image_url(self):
+    def get_image_url(self, width=None):
         """Get the URL for the image.
+        Args: width - optional width in pixels the image is shown at; the
+              smallest resized copy at least that wide is used once made
         Returns: URL string
         """
         # check if we have a URL first (backwards compatibility)
         if self.image_url:
             return self.image_url
-        # otherwise use the uploaded file
+        # otherwise use the uploaded file, or a copy of it
         elif self.image_file:
+            if width and self.variants:
+                return variant_url(self.variants, width)
             return self.image_file.url
         return ""
 
+    def get_srcset(self):
+        """Get a srcset listing the resized copies of the uploaded file.
+        Returns: srcset string, empty until copies are made
+        """
+        return variant_srcset(self.variants)
+
 class Follow(models.Model):
     """Model representing a follow relationship between two profiles."""
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE,
@@ -201,3 +325,145 @@ class Like(models.Model):
         """Return string representation of the like."""
         # show who liked what
         return f"{self.profile.display_name} liked post {self.post.id}"
+
+class FeedItem(models.Model):
+    """Model representing one post in one viewer's feed.
+    Rows are written when a post is created or a profile is followed, and
+    removed on unfollow or when the post is deleted (see signals.py), so a
+    feed is read straight from this table.
+    """
+    viewer = models.ForeignKey(Profile, on_delete=models.CASCADE,
+                               related_name="feed_items")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_items")
+    # copied from the post so the timeline index covers the sort
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['viewer', 'post'], name='feed_viewer_post_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['viewer', '-timestamp', '-post'], name='feed_viewer_time_idx'),
+        ]
+
+    def __str__(self):
+        """Return string representation of the feed item."""
+        return f"Post {self.post_id} in feed of profile {self.viewer_id}"
+
+# number of feed rows written per bulk insert
+FEED_BATCH_SIZE = 1000
+
+def fan_out_post(post):
+    """Add a new post to the feed of every follower of its author.
+    Returns: number of feed items written
+    """
+    follower_ids = Follow.objects.filter(profile_id=post.profile_id).values_list(
+        'follower_profile_id', flat=True)
+    items = [FeedItem(viewer_id=viewer_id, post=post, timestamp=post.timestamp)
+             for viewer_id in follower_ids]
+    FeedItem.objects.bulk_create(items, batch_size=FEED_BATCH_SIZE, ignore_conflicts=True)
+    return len(items)
+
+def add_to_feed(viewer_id, profile_id):
+    """Add every post by one profile to a viewer's feed, after a follow.
+    Returns: number of feed items written
+    """
+    posts = Post.objects.filter(profile_id=profile_id).values_list('pk', 'timestamp')
+    items = [FeedItem(viewer_id=viewer_id, post_id=pk, timestamp=timestamp)
+             for pk, timestamp in posts]
+    FeedItem.objects.bulk_create(items, batch_size=FEED_BATCH_SIZE, ignore_conflicts=True)
+    return len(items)
+
+def remove_from_feed(viewer_id, profile_id):
+    """Remove one profile's posts from a viewer's feed, after an unfollow."""
+    FeedItem.objects.filter(viewer_id=viewer_id, post__profile_id=profile_id).delete()
+
+def rebuild_feeds():
+    """Rebuild every feed from the Follow and Post tables.
+    Returns: number of feed items written
+    """
+    FeedItem.objects.all().delete()
+    total = 0
+    for viewer_id, profile_id in Follow.objects.values_list('follower_profile_id', 'profile_id'):
+        total += add_to_feed(viewer_id, profile_id)
+    return total
+
+# widths in pixels of the resized copies made of each uploaded photo
+VARIANT_WIDTHS = (320, 640, 1080)
+
+def variant_url(variants, width):
+    """Get the URL of the smallest resized copy at least width pixels wide.
+    Args: variants - Photo.variants dict of width to storage name
+    Returns: URL string, of the largest copy if none is wide enough
+    """
+    widths = sorted(int(key) for key in variants)
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return Photo._meta.get_field('image_file').storage.url(variants[str(chosen)])
+
+def variant_srcset(variants):
+    """Get a srcset attribute value listing every resized copy.
+    Returns: string such as "/media/variants/7/320.webp 320w, ...", or ''
+    """
+    storage = Photo._meta.get_field('image_file').storage
+    return ', '.join(f'{storage.url(variants[key])} {key}w'
+                     for key in sorted(variants, key=int))
+
+# counter columns of each model, mapped to the model they count and its
+# foreign key back to the counted-for row
+COUNTERS = {
+    Profile: {
+        'follower_count': (Follow, 'profile'),
+        'following_count': (Follow, 'follower_profile'),
+        'post_count': (Post, 'profile'),
+    },
+    Post: {
+        'like_count': (Like, 'post'),
+    },
+}
+
+def count_subquery(model, foreign_key):
+    """Count the rows of model pointing at the outer query's row.
+    Returns: expression for annotate(), 0 when there are none
+    """
+    counts = (model.objects.filter(**{foreign_key: OuterRef('pk')}).order_by()
+                           .values(foreign_key).annotate(total=Count('pk'))
+                           .values('total'))
+    return Coalesce(Subquery(counts), 0)
+
+def bump_page_version(*profile_ids):
+    """Expire the cached pages of the given profiles in every process."""
+    Profile.objects.filter(pk__in=profile_ids).update(page_version=F('page_version') + 1)
+
+def adjust_counter(model, pk, field, delta):
+    """Add delta to one counter column with an atomic UPDATE ... SET x = x + delta."""
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        # never take a drifted counter below zero
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+def reconcile_counters():
+    """Recount every counter column and repair the rows that have drifted.
+    Returns: dict of model name to number of rows repaired
+    """
+    repaired = {}
+    for model, counters in COUNTERS.items():
+        # one correlated COUNT subquery per counter, all in a single query
+        actual = {f'actual_{field}': count_subquery(counted, foreign_key)
+                  for field, (counted, foreign_key) in counters.items()}
+
+        drifted = Q()
+        for field in counters:
+            drifted |= ~Q(**{field: F(f'actual_{field}')})
+
+        rows = list(model.objects.annotate(**actual).filter(drifted))
+        for row in rows:
+            for field in counters:
+                setattr(row, field, getattr(row, f'actual_{field}'))
+        model.objects.bulk_update(rows, list(counters), batch_size=FEED_BATCH_SIZE)
+        if model is Profile:
+            # the repaired counts are shown on the cached profile pages
+            bump_page_version(*[row.pk for row in rows])
+        repaired[model.__name__] = len(rows)
+    return repaired
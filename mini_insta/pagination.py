@@ -0,0 +1,56 @@
+# Jack Lee
+# jacklee@bu.edu
+# pagination.py for mini_insta app - keyset pagination of the post feed, so
+# every page costs the same however long the feed is
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+FEED_PAGE_SIZE = 20
+
+# range of a signed 64-bit INTEGER column
+MIN_POST_ID = -(2 ** 63)
+MAX_POST_ID = 2 ** 63 - 1
+
+def encode_feed_cursor(post):
+    """Pack the feed position of a post into an opaque URL-safe token.
+    Returns: string
+    """
+    # feed entries copy the post's timestamp, so the post has the whole key
+    data = json.dumps([post.timestamp.isoformat(), post.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+def decode_feed_cursor(token):
+    """Unpack a feed cursor token.
+    Returns: (timestamp, post id), or None if the token is missing or invalid
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        timestamp, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    # bool is a subclass of int, and ids past 64 bits overflow the query
+    if type(post_id) is not int or not MIN_POST_ID <= post_id <= MAX_POST_ID:
+        return None
+    if timestamp.tzinfo is None:
+        return None
+    return timestamp, post_id
+
+def get_feed_page(profile, cursor=None, per_page=FEED_PAGE_SIZE):
+    """Get one page of a profile's feed, newest first.
+    Each page is a single query seeking past the cursor on feed_viewer_time_idx,
+    reading one row more than it shows to learn whether another page follows.
+    Args: profile - Profile whose feed is read
+          cursor - next_cursor of the previous page, or None for the first page
+    Returns: (list of Post objects, next page cursor or '' on the last page)
+    """
+    posts = list(profile.get_post_feed(before=decode_feed_cursor(cursor))
+                        .with_summary(profile).with_first_comment()[:per_page + 1])
+    if len(posts) > per_page:
+        return posts[:per_page], encode_feed_cursor(posts[per_page - 1])
+    return posts, ''
@@ -0,0 +1,122 @@
+# Jack Lee
+# jacklee@bu.edu
+# search.py for mini_insta app - ranked search over post captions and
+# profiles, backed by SQLite FTS5 tables that signals.py keeps current
+
+import re
+from django.db import connection
+from .models import Profile, Post
+
+# FTS5 table, indexed columns and bm25 column weights for each searchable model
+POST_SEARCH = {
+    'table': 'mini_insta_post_fts',
+    'fields': ('caption',),
+    'weights': (1.0,),
+}
+PROFILE_SEARCH = {
+    'table': 'mini_insta_profile_fts',
+    'fields': ('username', 'display_name', 'bio_text'),
+    # name matches rank above bios
+    'weights': (10.0, 10.0, 1.0),
+}
+SEARCH_INDEXES = {Post: POST_SEARCH, Profile: PROFILE_SEARCH}
+
+def match_expression(query):
+    """Turn search box text into an FTS5 query matching every word as a prefix.
+    Words are quoted so FTS5 syntax typed by the user is searched as text.
+    Returns: MATCH string, or '' if there are no words
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+def index_object(instance):
+    """Add or replace the search entry of one Post or Profile."""
+    index = SEARCH_INDEXES[type(instance)]
+    fields = index['fields']
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {index['table']} WHERE rowid = %s", [instance.pk])
+        cursor.execute(
+            f"INSERT INTO {index['table']} (rowid, {', '.join(fields)}) "
+            f"VALUES (%s{', %s' * len(fields)})",
+            [instance.pk] + [getattr(instance, field) for field in fields],
+        )
+
+def unindex_object(model, pk):
+    """Remove the search entry of one Post or Profile."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_INDEXES[model]['table']} WHERE rowid = %s", [pk])
+
+def rebuild_search_index():
+    """Refill every search table from its model's table.
+    Returns: dict of model name to number of rows indexed
+    """
+    indexed = {}
+    with connection.cursor() as cursor:
+        for model, index in SEARCH_INDEXES.items():
+            fields = ', '.join(index['fields'])
+            cursor.execute(f"DELETE FROM {index['table']}")
+            cursor.execute(
+                f"INSERT INTO {index['table']} (rowid, {fields}) "
+                f"SELECT id, {fields} FROM {model._meta.db_table}"
+            )
+            indexed[model.__name__] = cursor.rowcount
+            # merge the index b-trees so lookups touch as few pages as possible
+            cursor.execute(f"INSERT INTO {index['table']} ({index['table']}) VALUES ('optimize')")
+    return indexed
+
+class SearchResults:
+    """Lazy, ranked search results that Django's Paginator can slice.
+    Only one page of ids is read from the index, in bm25 order, and only
+    those rows are then loaded from the queryset.
+    """
+
+    def __init__(self, queryset, query):
+        """Args: queryset - Post or Profile QuerySet the rows are loaded from,
+                            such as one annotated by with_summary
+                 query - text typed into the search box
+        """
+        self.queryset = queryset
+        self.index = SEARCH_INDEXES[queryset.model]
+        self.match = match_expression(query)
+        self._count = None
+
+    def count(self):
+        """Number of matching rows."""
+        if self._count is None:
+            self._count = 0
+            if self.match:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT COUNT(*) FROM {self.index['table']} "
+                        f"WHERE {self.index['table']} MATCH %s", [self.match])
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        """Number of matching rows."""
+        return self.count()
+
+    def __getitem__(self, index):
+        """Load a page of rows in rank order.
+        Args: index - slice, as passed by Paginator
+        Returns: list of model instances
+        """
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        table = self.index['table']
+        weights = ', '.join(str(weight) for weight in self.index['weights'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s "
+                f"ORDER BY bm25({table}, {weights}), rowid LIMIT %s OFFSET %s",
+                [self.match, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        rows = self.queryset.in_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows]
@@ -0,0 +1,124 @@
+# Jack Lee
+# jacklee@bu.edu
+# signals.py for mini_insta app - expires cached profile pages and keeps the
+# materialized feeds, counter columns, search index and photo copies in
+# step with profiles, posts, photos, follows and likes
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import (Profile, Post, Photo, Follow, Like, fan_out_post, add_to_feed,
+                     remove_from_feed, adjust_counter, bump_page_version)
+from .search import index_object, unindex_object
+from .thumbnails import queue_variants
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    """Expire the profile's cached header and post grid."""
+    bump_page_version(instance.pk)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def photo_changed(sender, instance, **kwargs):
+    """Expire the post grid showing the photo's post."""
+    # the post is already gone if it is being deleted along with its photos,
+    # and post_changed handles that case
+    bump_page_version(*Post.objects.filter(pk=instance.post_id).values_list('profile_id', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    """Fan a new post out to its author's followers."""
+    # deleted posts leave the feeds through the FeedItem foreign key cascade
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Fill the follower's feed with the followed profile's posts."""
+    if created:
+        add_to_feed(instance.follower_profile_id, instance.profile_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Take the unfollowed profile's posts out of the follower's feed."""
+    remove_from_feed(instance.follower_profile_id, instance.profile_id)
+
+
+# the handlers below bump page_version after changing the counts, in the
+# same transaction; bumped first, a page rendered in between would cache the
+# old counts under the new version until the next change
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    """Count the new follow on both profiles and expire their cached pages."""
+    with transaction.atomic():
+        if created:
+            adjust_counter(Profile, instance.profile_id, 'follower_count', 1)
+            adjust_counter(Profile, instance.follower_profile_id, 'following_count', 1)
+        bump_page_version(instance.profile_id, instance.follower_profile_id)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    """Take the removed follow off both profiles' counts and expire their cached pages."""
+    with transaction.atomic():
+        adjust_counter(Profile, instance.profile_id, 'follower_count', -1)
+        adjust_counter(Profile, instance.follower_profile_id, 'following_count', -1)
+        bump_page_version(instance.profile_id, instance.follower_profile_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    """Count a new post on its author's profile and expire the author's post grid."""
+    with transaction.atomic():
+        if created:
+            adjust_counter(Profile, instance.profile_id, 'post_count', 1)
+        bump_page_version(instance.profile_id)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    """Take the deleted post off its author's count and expire the author's post grid."""
+    with transaction.atomic():
+        adjust_counter(Profile, instance.profile_id, 'post_count', -1)
+        bump_page_version(instance.profile_id)
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, **kwargs):
+    """Count the new like on its post."""
+    if created:
+        adjust_counter(Post, instance.post_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, **kwargs):
+    """Take the removed like off its post's count."""
+    adjust_counter(Post, instance.post_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def index_saved(sender, instance, **kwargs):
+    """Keep the saved post's or profile's search entry current."""
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Profile)
+def unindex_deleted(sender, instance, **kwargs):
+    """Remove the deleted post or profile from the search index."""
+    unindex_object(sender, instance.pk)
+
+
+@receiver(post_save, sender=Photo)
+def photo_uploaded(sender, instance, created, **kwargs):
+    """Queue the resized copies of a newly uploaded photo."""
+    if created and instance.image_file:
+        queue_variants(instance)
@@ -0,0 +1,18 @@
+# Jack Lee
+# jacklee@bu.edu
+# photo_sizes.py for mini_insta app - template filters picking a resized
+# copy of a photo for the width it is shown at
+
+from django import template
+
+register = template.Library()
+
+@register.filter
+def photo_url(photo, width):
+    """URL of a photo for showing at width pixels, e.g. {{ photo|photo_url:640 }}."""
+    return photo.get_image_url(int(width))
+
+@register.filter
+def cover_url(post, width):
+    """URL of a post's first photo for showing at width pixels."""
+    return post.get_cover_url(int(width))
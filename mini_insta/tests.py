@@ -1,6 +1,25 @@
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from .models import Profile, Post, Photo, Follow, Comment, Like, FeedItem
+from .pagination import FEED_PAGE_SIZE, decode_feed_cursor, get_feed_page
+from .search import SearchResults, rebuild_search_index
+from .thumbnails import make_variants
+from PIL import ExifTags, Image
 
 
 class CreateProfileFlowTests(TestCase):
@@ -31,3 +50,501 @@ class CreateProfileFlowTests(TestCase):
         self.assertIsNotNone(profile)
         self.assertEqual(profile.username, 'integrationtester_profile')
         self.assertEqual(profile.user.username, 'integrationtester')
+
+
+class ProfilePageCacheTests(TestCase):
+    """Verify that profile pages are cached until something on them changes."""
+
+    def setUp(self):
+        """Create two profiles and clear the cache."""
+        cache.clear()
+        self.alice = Profile.objects.create(
+            user=User.objects.create_user('alice', password='pw'), username='alice',
+            display_name='Alice', profile_image_url='https://example.com/a.png')
+        self.bob = Profile.objects.create(
+            user=User.objects.create_user('bob', password='pw'), username='bob',
+            display_name='Bob', profile_image_url='https://example.com/b.png')
+        self.url = reverse('mini_insta:show_profile', kwargs={'pk': self.alice.pk})
+
+    def test_repeat_visit_reads_only_the_version(self):
+        """An anonymous repeat visit is served from the cache after one version query."""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Alice')
+
+    def test_version_in_database_expires_page(self):
+        """A change made by another process, which cannot touch this cache, still shows."""
+        self.client.get(self.url)
+        Profile.objects.filter(pk=self.alice.pk).update(display_name='Alice Elsewhere',
+                                                        page_version=F('page_version') + 1)
+        self.assertContains(self.client.get(self.url), 'Alice Elsewhere')
+
+    def test_changes_expire_the_page(self):
+        """Editing the profile, posting, adding a photo and following all show up."""
+        self.client.get(self.url)
+
+        self.alice.display_name = 'Alice Smith'
+        self.alice.save()
+        self.assertContains(self.client.get(self.url), 'Alice Smith')
+
+        post = Post.objects.create(profile=self.alice, caption='first day at the beach')
+        self.assertContains(self.client.get(self.url), 'first day at the beach')
+
+        Photo.objects.create(post=post, image_url='https://example.com/beach.png')
+        self.assertContains(self.client.get(self.url), 'https://example.com/beach.png')
+
+        Follow.objects.create(profile=self.alice, follower_profile=self.bob)
+        self.assertContains(self.client.get(self.url), '1 follower')
+
+    def test_follow_button_is_per_visitor(self):
+        """The cached parts are shared, but the follow button reflects the viewer."""
+        follow_url = reverse('mini_insta:follow', kwargs={'pk': self.alice.pk})
+        unfollow_url = reverse('mini_insta:delete_follow', kwargs={'pk': self.alice.pk})
+        self.client.get(self.url)
+
+        self.client.login(username='bob', password='pw')
+        response = self.client.get(self.url)
+        self.assertContains(response, follow_url)
+        self.assertNotContains(response, unfollow_url)
+
+        Follow.objects.create(profile=self.alice, follower_profile=self.bob)
+        self.assertContains(self.client.get(self.url), unfollow_url)
+
+
+class MaterializedFeedTests(TestCase):
+    """Verify the fan-out-on-write feed table."""
+
+    def setUp(self):
+        """Create a reader who follows two of three authors."""
+        self.reader, self.ann, self.ben, self.cat = [
+            Profile.objects.create(user=User.objects.create_user(name), username=name,
+                                   display_name=name.title(),
+                                   profile_image_url='https://example.com/p.png')
+            for name in ('reader', 'ann', 'ben', 'cat')]
+        Follow.objects.create(profile=self.ann, follower_profile=self.reader)
+        Follow.objects.create(profile=self.ben, follower_profile=self.reader)
+
+    def feed(self):
+        """Captions in the reader's feed, newest first."""
+        return [post.caption for post in self.reader.get_post_feed()]
+
+    def test_posts_fan_out_to_followers(self):
+        """New posts by followed profiles appear in one query, newest first."""
+        Post.objects.create(profile=self.ann, caption='ann 1')
+        Post.objects.create(profile=self.cat, caption='cat 1')
+        Post.objects.create(profile=self.ben, caption='ben 1')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.feed(), ['ben 1', 'ann 1'])
+
+    def test_follow_unfollow_and_delete(self):
+        """Following adds old posts, and unfollowing or deleting removes them."""
+        cat_post = Post.objects.create(profile=self.cat, caption='cat 1')
+        Post.objects.create(profile=self.ann, caption='ann 1')
+
+        Follow.objects.create(profile=self.cat, follower_profile=self.reader)
+        self.assertEqual(sorted(self.feed()), ['ann 1', 'cat 1'])
+
+        Follow.objects.filter(profile=self.ann, follower_profile=self.reader).delete()
+        self.assertEqual(self.feed(), ['cat 1'])
+
+        cat_post.delete()
+        self.assertEqual(self.feed(), [])
+
+    def test_backfill_command(self):
+        """The backfill command rebuilds feeds that have drifted."""
+        Post.objects.create(profile=self.ann, caption='ann 1')
+        FeedItem.objects.all().delete()
+
+        call_command('backfill_feed', stdout=io.StringIO())
+        self.assertEqual(self.feed(), ['ann 1'])
+
+
+class CounterTests(TestCase):
+    """Verify the denormalized follower, following, post and like counts."""
+
+    def setUp(self):
+        """Create two profiles."""
+        self.ann, self.ben = [
+            Profile.objects.create(user=User.objects.create_user(name), username=name,
+                                   display_name=name.title(),
+                                   profile_image_url='https://example.com/p.png')
+            for name in ('ann', 'ben')]
+
+    def counts(self, profile):
+        """Follower, following and post counts as stored in the database."""
+        return Profile.objects.values_list(
+            'follower_count', 'following_count', 'post_count').get(pk=profile.pk)
+
+    def test_counts_follow_changes(self):
+        """Follows, posts and likes are counted as they are made and removed."""
+        follow = Follow.objects.create(profile=self.ann, follower_profile=self.ben)
+        post = Post.objects.create(profile=self.ann, caption='hello')
+        like = Like.objects.create(post=post, profile=self.ben)
+        self.assertEqual(self.counts(self.ann), (1, 0, 1))
+        self.assertEqual(self.counts(self.ben), (0, 1, 0))
+        self.assertEqual(Post.objects.get(pk=post.pk).like_count, 1)
+
+        like.delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).like_count, 0)
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.counts(self.ann), (0, 0, 0))
+        self.assertEqual(self.counts(self.ben), (0, 0, 0))
+
+    def test_page_version_bumped_after_counts(self):
+        """Cached pages expire only once the new counts are written."""
+        for change in [lambda: Follow.objects.create(profile=self.ann, follower_profile=self.ben),
+                       lambda: Follow.objects.get().delete(),
+                       lambda: Post.objects.create(profile=self.ann),
+                       lambda: Post.objects.get().delete()]:
+            with CaptureQueriesContext(connection) as queries:
+                change()
+            updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+            counted = [i for i, sql in enumerate(updates) if '_count' in sql]
+            bumped = [i for i, sql in enumerate(updates) if '"page_version"' in sql]
+            self.assertTrue(counted and bumped)
+            self.assertLess(max(counted), min(bumped))
+
+    def test_saving_stale_instance_keeps_counts(self):
+        """Saving a profile loaded before a follow does not write back its old counts."""
+        stale = Profile.objects.get(pk=self.ann.pk)
+        Follow.objects.create(profile=self.ann, follower_profile=self.ben)
+        stale.bio_text = 'edited'
+        stale.save()
+        self.assertEqual(self.counts(self.ann), (1, 0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        """The reconcile command recounts rows that have drifted, and only those."""
+        Follow.objects.create(profile=self.ann, follower_profile=self.ben)
+        post = Post.objects.create(profile=self.ann, caption='hello')
+        Like.objects.create(post=post, profile=self.ben)
+        Profile.objects.filter(pk=self.ann.pk).update(follower_count=7, post_count=0)
+        Post.objects.filter(pk=post.pk).update(like_count=3)
+
+        out = io.StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Repaired 1 Profile rows.', out.getvalue())
+        self.assertIn('Repaired 1 Post rows.', out.getvalue())
+        self.assertEqual(self.counts(self.ann), (1, 0, 1))
+        self.assertEqual(Post.objects.get(pk=post.pk).like_count, 1)
+
+    def test_header_needs_no_counting(self):
+        """The profile header renders from the loaded row without further queries."""
+        Follow.objects.create(profile=self.ann, follower_profile=self.ben)
+        profile = Profile.objects.get(pk=self.ann.pk)
+        with self.assertNumQueries(0):
+            html = render_to_string('mini_insta/profile_summary.html', {'profile': profile})
+        self.assertIn('1 follower', html)
+
+
+class PostSummaryTests(TestCase):
+    """Verify the with_summary annotations and the constant query counts they give."""
+
+    def setUp(self):
+        """Create a logged in reader following one author."""
+        cache.clear()
+        self.reader = Profile.objects.create(
+            user=User.objects.create_user('reader', password='pw'), username='reader',
+            display_name='Reader', profile_image_url='https://example.com/r.png')
+        self.author = Profile.objects.create(
+            user=User.objects.create_user('author', password='pw'), username='author',
+            display_name='Author', profile_image_url='https://example.com/a.png')
+        Follow.objects.create(profile=self.author, follower_profile=self.reader)
+        self.client.login(username='reader', password='pw')
+
+    def add_posts(self, count):
+        """Give the author count posts, each with two photos, a comment and a like."""
+        for n in range(count):
+            post = Post.objects.create(profile=self.author, caption=f'kitty {n}')
+            Photo.objects.create(post=post, image_url=f'https://example.com/{n}-1.png')
+            Photo.objects.create(post=post, image_url=f'https://example.com/{n}-2.png')
+            Comment.objects.create(post=post, profile=self.reader, text=f'cute {n}')
+            Like.objects.create(post=post, profile=self.reader)
+
+    def test_annotations(self):
+        """A post carries its cover, counts and the viewer's like state."""
+        self.add_posts(1)
+        post = Post.objects.with_summary(self.reader).get()
+        self.assertEqual(post.get_cover_url(), 'https://example.com/0-1.png')
+        self.assertEqual((post.photo_count, post.comment_count, post.like_count), (2, 1, 1))
+        self.assertTrue(post.liked_by_viewer)
+        self.assertFalse(Post.objects.with_summary(self.author).get().liked_by_viewer)
+        self.assertFalse(Post.objects.with_summary().get().liked_by_viewer)
+
+    def query_count(self, url):
+        """Number of queries one GET of url takes, from a cold cache."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_posts(self):
+        """Profile, feed and search pages take as many queries for 2 posts as for 8."""
+        urls = [reverse('mini_insta:show_profile', kwargs={'pk': self.author.pk}),
+                reverse('mini_insta:show_feed'),
+                reverse('mini_insta:search') + '?query=kitty']
+        self.add_posts(2)
+        few = [self.query_count(url) for url in urls]
+        self.add_posts(6)
+        self.assertEqual([self.query_count(url) for url in urls], few)
+        self.assertContains(self.client.get(urls[1]), 'https://example.com/5-1.png')
+
+
+class FeedPaginationTests(TestCase):
+    """Verify keyset pagination of the feed page and the JSON feed."""
+
+    def setUp(self):
+        """Create a logged in reader following an author with many posts."""
+        self.reader = Profile.objects.create(
+            user=User.objects.create_user('reader', password='pw'), username='reader',
+            display_name='Reader', profile_image_url='https://example.com/r.png')
+        self.author = Profile.objects.create(
+            user=User.objects.create_user('author', password='pw'), username='author',
+            display_name='Author', profile_image_url='https://example.com/a.png')
+        Follow.objects.create(profile=self.author, follower_profile=self.reader)
+        self.posts = [Post.objects.create(profile=self.author, caption=f'post {n}')
+                      for n in range(FEED_PAGE_SIZE + 5)]
+        self.client.login(username='reader', password='pw')
+
+    def test_pages_cover_feed_once(self):
+        """Walking the cursors visits every post once, newest first, even with tied timestamps."""
+        # give half the posts the same timestamp so the id has to break ties
+        tied = self.posts[0].timestamp
+        tied_ids = [post.pk for post in self.posts[:12]]
+        Post.objects.filter(pk__in=tied_ids).update(timestamp=tied)
+        FeedItem.objects.filter(post_id__in=tied_ids).update(timestamp=tied)
+
+        seen, cursor = [], None
+        while True:
+            posts, cursor = get_feed_page(self.reader, cursor, per_page=5)
+            seen += [post.pk for post in posts]
+            if not cursor:
+                break
+        self.assertEqual(seen, [post.pk for post in self.reader.get_post_feed()])
+        self.assertEqual(sorted(seen), sorted(post.pk for post in self.posts))
+
+    def test_feed_page_links_to_next(self):
+        """The feed page shows one page of posts and links to the rest."""
+        response = self.client.get(reverse('mini_insta:show_feed'))
+        self.assertEqual(len(response.context['posts']), FEED_PAGE_SIZE)
+        self.assertContains(response, 'Older posts')
+        self.assertContains(response, '<title>Feed - Reader - Mini Insta</title>', html=False)
+        self.assertEqual(response.content.decode().count('<script>'), 1)
+
+        response = self.client.get(reverse('mini_insta:show_feed'),
+                                   {'cursor': response.context['next_cursor']})
+        self.assertEqual([post.caption for post in response.context['posts']],
+                         [f'post {n}' for n in range(4, -1, -1)])
+        self.assertNotContains(response, 'Older posts')
+
+    def test_json_feed(self):
+        """The JSON feed returns compact cards and an opaque cursor, and rejects bad cursors."""
+        url = reverse('mini_insta:feed_json')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['posts']), FEED_PAGE_SIZE)
+        self.assertEqual(first['posts'][0]['caption'], f'post {FEED_PAGE_SIZE + 4}')
+        self.assertEqual(first['posts'][0]['profile']['username'], 'author')
+
+        # a deep page takes no more queries than the first
+        with CaptureQueriesContext(connection) as first_queries:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as next_queries:
+            second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(next_queries), len(first_queries))
+        self.assertEqual(len(second['posts']), 5)
+        self.assertIsNone(second['next_cursor'])
+
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_forged_cursors_are_rejected(self):
+        """Cursors with ids no post could have are refused rather than failing the query."""
+        timestamp = Post.objects.first().timestamp.isoformat()
+        for post_id in [2 ** 70, -(2 ** 63) - 1, True]:
+            with self.subTest(post_id=post_id):
+                data = json.dumps([timestamp, post_id]).encode()
+                cursor = base64.urlsafe_b64encode(data).decode().rstrip('=')
+                self.assertIsNone(decode_feed_cursor(cursor))
+                response = self.client.get(reverse('mini_insta:show_feed'), {'cursor': cursor})
+                self.assertEqual(len(response.context['posts']), FEED_PAGE_SIZE)
+                self.assertEqual(self.client.get(reverse('mini_insta:feed_json'),
+                                                 {'cursor': cursor}).status_code, 400)
+
+
+class SearchIndexTests(TestCase):
+    """Verify the full text search over posts and profiles."""
+
+    def setUp(self):
+        """Create a logged in searcher and a few profiles and posts."""
+        self.searcher = Profile.objects.create(
+            user=User.objects.create_user('searcher', password='pw'), username='searcher',
+            display_name='Searcher', profile_image_url='https://example.com/s.png')
+        self.tabby = Profile.objects.create(
+            user=User.objects.create_user('tabby'), username='tabbycat', display_name='Tabby',
+            bio_text='orange and loud', profile_image_url='https://example.com/t.png')
+        self.fan = Profile.objects.create(
+            user=User.objects.create_user('fan'), username='fan', display_name='Fan',
+            bio_text='I love every tabby I meet', profile_image_url='https://example.com/f.png')
+        self.nap = Post.objects.create(profile=self.tabby, caption='Sunny window nap')
+        Post.objects.create(profile=self.tabby, caption='Chasing the red dot')
+        self.client.login(username='searcher', password='pw')
+
+    def search(self, model, query):
+        """Rows of model matching query, best first."""
+        queryset = Post.objects.with_summary() if model is Post else Profile.objects.all()
+        return list(SearchResults(queryset, query)[0:20])
+
+    def test_ranked_prefix_search(self):
+        """Words match as prefixes, name matches outrank bios, and operators are plain text."""
+        self.assertEqual(self.search(Profile, 'tabb'), [self.tabby, self.fan])
+        self.assertEqual(self.search(Post, 'sun nap'), [self.nap])
+        self.assertEqual(self.search(Post, '"nap* -('), [self.nap])
+        self.assertEqual(self.search(Post, '!!!'), [])
+
+    def test_signals_keep_index_current(self):
+        """Edits and deletes show up in the next search."""
+        self.nap.caption = 'Rainy window nap'
+        self.nap.save()
+        self.assertEqual(self.search(Post, 'sunny'), [])
+        self.assertEqual(self.search(Post, 'rainy'), [self.nap])
+
+        self.tabby.delete()
+        self.assertEqual(self.search(Post, 'nap'), [])
+        self.assertEqual(self.search(Profile, 'tabby'), [self.fan])
+
+    def test_rebuild(self):
+        """Rebuilding restores an index that has drifted."""
+        Post.objects.filter(pk=self.nap.pk).update(caption='Midnight zoomies')
+        self.assertEqual(rebuild_search_index(), {'Post': 2, 'Profile': 3})
+        self.assertEqual(self.search(Post, 'zoomies'), [self.nap])
+
+        out = io.StringIO()
+        call_command('rebuild_search', stdout=out)
+        self.assertIn('Indexed 2 Post rows.', out.getvalue())
+
+    def test_search_page_is_paginated(self):
+        """The search page shows ten posts per page with a link to the next."""
+        for n in range(12):
+            Post.objects.create(profile=self.tabby, caption=f'window seat {n}')
+        url = reverse('mini_insta:search')
+        response = self.client.get(url, {'query': 'window'})
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertContains(response, 'Matching Posts (13)')
+        self.assertContains(response, 'query=window&amp;page=2')
+
+        response = self.client.get(url, {'query': 'window', 'page': 2})
+        self.assertEqual(len(response.context['posts']), 3)
+
+    def test_empty_query_lists_everything(self):
+        """Submitting the search form without a query lists every post and profile."""
+        response = self.client.get(reverse('mini_insta:search'), {'query': ''})
+        self.assertEqual(list(response.context['posts']), list(Post.objects.order_by('pk')))
+        self.assertEqual(list(response.context['profiles']), list(Profile.objects.order_by('pk')))
+
+
+def jpeg_upload(name='cat.jpg', size=(2000, 1500), orientation=1):
+    """A noisy JPEG the size of a phone photo, as an uploaded file."""
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = orientation
+    Image.effect_noise(size, 60).convert('RGB').save(buffer, 'JPEG', quality=90, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ThumbnailTests(TestCase):
+    """Verify that uploads are resized in the background and pages use the copies."""
+
+    def setUp(self):
+        """Point uploads at a scratch directory and log in an author."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+        self.author = Profile.objects.create(
+            user=User.objects.create_user('author', password='pw'), username='author',
+            display_name='Author', profile_image_url='https://example.com/a.png')
+        self.client.login(username='author', password='pw')
+
+    def upload(self):
+        """Create a post with one photo through the create post page."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('mini_insta:create_post'),
+                             {'caption': 'big cat', 'files': [jpeg_upload()]})
+        return Photo.objects.get(), callbacks
+
+    def test_upload_queues_variants(self):
+        """The upload only queues the resizing, which runs after the commit."""
+        photo, callbacks = self.upload()
+        self.assertEqual(photo.variants, {})
+        self.assertEqual(len(callbacks), 1)
+
+    def test_variants_are_much_smaller(self):
+        """Each width gets a WebP copy, and the grid size is a small fraction of the original."""
+        photo, _ = self.upload()
+        variants = make_variants(photo.pk)
+        self.assertEqual(sorted(variants, key=int), ['320', '640', '1080'])
+
+        photo.refresh_from_db()
+        storage = photo.image_file.storage
+        with storage.open(variants['640']) as file:
+            self.assertEqual(Image.open(file).size, (640, 480))
+        self.assertLess(storage.size(variants['320']) * 10, photo.image_file.size)
+        self.assertTrue(photo.get_image_url(400).endswith('/640.webp'))
+        self.assertTrue(photo.get_image_url(5000).endswith('/1080.webp'))
+
+    def test_small_photo_keeps_its_width(self):
+        """A photo narrower than every copy is re-encoded at its own width."""
+        photo = Photo.objects.create(post=Post.objects.create(profile=self.author),
+                                     image_file=jpeg_upload(size=(200, 100)))
+        self.assertEqual(list(make_variants(photo.pk)), ['200'])
+
+    def test_sideways_photo_is_sized_upright(self):
+        """A photo stored sideways is measured and keyed by its upright width."""
+        photo = Photo.objects.create(post=Post.objects.create(profile=self.author),
+                                     image_file=jpeg_upload(size=(1200, 800), orientation=6))
+        variants = make_variants(photo.pk)
+        self.assertEqual(sorted(variants, key=int), ['320', '640'])
+        with photo.image_file.storage.open(variants['640']) as file:
+            self.assertEqual(Image.open(file).size, (640, 960))
+
+    def test_pages_request_sized_copies(self):
+        """The profile grid asks for the small copy and lists the rest in srcset."""
+        photo, _ = self.upload()
+        response = self.client.get(reverse('mini_insta:show_profile', kwargs={'pk': self.author.pk}))
+        self.assertContains(response, photo.image_file.url)
+
+        make_variants(photo.pk)
+        response = self.client.get(reverse('mini_insta:show_profile', kwargs={'pk': self.author.pk}))
+        self.assertContains(response, f'src="/media/variants/{photo.pk}/320.webp"')
+        self.assertContains(response, f'/media/variants/{photo.pk}/1080.webp 1080w')
+        self.assertNotContains(response, photo.image_file.url)
+
+
+class MakeThumbnailsCommandTests(TransactionTestCase):
+    """Verify the backfill command, whose worker threads need committed rows."""
+
+    def test_backfills_missing_variants(self):
+        """Photos without copies get them, and URL photos are left alone."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            profile = Profile.objects.create(
+                user=User.objects.create_user('author'), username='author',
+                display_name='Author', profile_image_url='https://example.com/a.png')
+            post = Post.objects.create(profile=profile)
+            Photo.objects.create(post=post, image_url='https://example.com/cat.png')
+            # bulk_create sends no signals, so nothing is queued, as for older uploads
+            storage = Photo._meta.get_field('image_file').storage
+            photo, = Photo.objects.bulk_create(
+                [Photo(post=post, image_file=storage.save('cat.jpg', jpeg_upload()))])
+
+            out = io.StringIO()
+            call_command('make_thumbnails', '--workers', '2', stdout=out)
+            self.assertIn('Made resized copies of 1 of 1 photos.', out.getvalue())
+            photo.refresh_from_db()
+            self.assertEqual(len(photo.variants), 3)
+            self.assertTrue(os.path.exists(os.path.join(media_root, photo.variants['320'])))
@@ -0,0 +1,107 @@
+# Jack Lee
+# jacklee@bu.edu
+# thumbnails.py for mini_insta app - makes resized copies of uploaded photos
+# on a pool of worker threads, after the upload request has returned
+
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import ExifTags, Image, ImageOps
+from .models import Photo, VARIANT_WIDTHS
+
+# copies are re-encoded as WebP, which is far smaller than the uploaded JPEGs
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+
+# EXIF orientations whose upright image is the stored one turned on its side
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Pillow releases the GIL while it decodes, resizes and encodes, so threads
+# make copies in parallel without the cost of extra processes
+THUMBNAIL_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+_pool = None
+
+def worker_pool():
+    """Get the shared pool of thumbnail threads, starting it on first use.
+    Returns: ThreadPoolExecutor
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                   thread_name_prefix='mini_insta_thumbnails')
+    return _pool
+
+def resize(image, width):
+    """Scale an image down to width pixels wide, keeping its shape.
+    Returns: PIL Image
+    """
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+def make_variants(photo_id):
+    """Write the resized copies of one uploaded photo and record them on it.
+    Copies are only made narrower than the original; a photo narrower than
+    every size in VARIANT_WIDTHS gets one re-encoded copy at its own width.
+    Returns: dict of width to storage name, empty for photos without a file
+    """
+    photo = Photo.objects.filter(pk=photo_id).first()
+    if photo is None or not photo.image_file:
+        return {}
+    storage = photo.image_file.storage
+
+    with photo.image_file.open('rb') as file:
+        image = Image.open(file)
+        # phone photos are often stored sideways with an EXIF orientation,
+        # so the copies are sized by the width the photo is displayed at
+        width, height = image.size
+        if image.getexif().get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        widths = [w for w in VARIANT_WIDTHS if w < width] or [width]
+        # let JPEG decoding skip straight to a scale near the largest copy;
+        # draft works on the stored image, before it is turned upright
+        box = (max(widths), max(widths) * height // width)
+        image.draft('RGB', box if (width, height) == image.size else box[::-1])
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    variants = {}
+    # each copy is scaled from the next larger one, which is cheaper than
+    # going back to the original and looks the same at these ratios
+    source = image
+    for width in sorted(widths, reverse=True):
+        source = resize(source, width) if width < source.width else source
+        buffer = io.BytesIO()
+        source.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+        # keyed by the copy's real width, which srcset advertises
+        name = f'variants/{photo.pk}/{source.width}.{VARIANT_EXTENSION}'
+        if storage.exists(name):
+            storage.delete(name)
+        variants[str(source.width)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    # saving sends post_save, which expires the cached pages showing the photo
+    photo.variants = variants
+    photo.save(update_fields=['variants'])
+    return variants
+
+def make_variants_in_worker(photo_id):
+    """Make one photo's copies on a worker thread, logging instead of raising."""
+    try:
+        return make_variants(photo_id)
+    except Exception:
+        # nothing waits on the result, so this is the only place to report it
+        logger.exception("Could not make resized copies of photo %s", photo_id)
+        return {}
+    finally:
+        # each worker thread has its own database connection
+        connection.close()
+
+def queue_variants(photo):
+    """Make the photo's copies on the worker pool once its upload is committed."""
+    photo_id = photo.pk
+    transaction.on_commit(lambda: worker_pool().submit(make_variants_in_worker, photo_id))
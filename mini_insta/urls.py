@@ -21,6 +21,7 @@ urlpatterns = [
     # refactored URLs for A7 - no pk needed for authenticated user operations
     path('profile/', views.ShowOwnProfileView.as_view(), name='show_own_profile'),
     path('profile/feed/', views.PostFeedListView.as_view(), name='show_feed'),
+    path('profile/feed.json', views.PostFeedJSONView.as_view(), name='feed_json'),
     path('profile/search/', views.SearchView.as_view(), name='search'),
     path('profile/update/', views.UpdateProfileView.as_view(), name='update_profile'),
     path('profile/create_post/', views.CreatePostView.as_view(), name='create_post'),
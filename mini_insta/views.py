@@ -3,15 +3,19 @@
 # views.py for mini_insta app - handles web page rendering and form processing
 
 from django.shortcuts import render, get_object_or_404
-from django.views.generic import (ListView, DetailView, CreateView,
+from django.template.loader import render_to_string
+from django.views.generic import (View, ListView, DetailView, CreateView,
                                   UpdateView, DeleteView, TemplateView)
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.urls import reverse
-from django.db import models
+from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
+from cs412.object_cache import cached_for_object
 from .models import Profile, Post, Photo, Follow, Comment, Like
+from .pagination import decode_feed_cursor, get_feed_page
+from .search import SearchResults
 from .forms import CreatePostForm, UpdateProfileForm, UpdatePostForm, CreateProfileForm
 
 # Create your views here.
@@ -46,22 +50,50 @@ class ProfileListView(ListView):
     template_name = 'mini_insta/show_all_profiles.html'
     context_object_name = 'profiles'
 
+def get_profile_page(pk):
+    """Get the parts of a profile page that look the same to every visitor.
+    The header and post grid are rendered once and served from the object
+    cache until a signal in signals.py bumps the profile's page_version.
+    Reading that version is the only query on a cache hit.
+    Args: pk - primary key of the Profile
+    Returns: dict with pk, user_id, display_name and summary and posts HTML
+    """
+    version = Profile.objects.filter(pk=pk).values_list('page_version', flat=True).first()
+    if version is None:
+        raise Http404("No profile matches the given query.")
+
+    def render():
+        profile = get_object_or_404(Profile, pk=pk)
+        # the grid is shared by every visitor, so nothing viewer specific
+        posts = Post.objects.filter(profile=profile).with_summary().order_by('-timestamp')
+        context = {'profile': profile, 'posts': posts}
+        return {
+            'pk': profile.pk,
+            'user_id': profile.user_id,
+            'display_name': profile.display_name,
+            'summary': render_to_string('mini_insta/profile_summary.html', context),
+            'posts': render_to_string('mini_insta/profile_posts.html', context),
+        }
+
+    return cached_for_object(Profile, pk, 'profile_page', version, render)
+
 def show_profile(request, pk):
     """Display a single profile page.
     Args: pk - primary key of the Profile to display
     Returns: rendered show_profile.html template
     """
     # print("Debug: showing profile", pk)  # left this here for debugging
-    profile_obj = get_object_or_404(Profile, pk=pk)
-    context = {'profile': profile_obj, 'is_following_profile': False}
+    profile_page = get_profile_page(pk)
+    context = {'profile_page': profile_page, 'is_following_profile': False}
 
     # add the logged in user's profile if authenticated
     if request.user.is_authenticated:
         try:
             logged_in_profile = Profile.objects.get(user=request.user)
             context['logged_in_profile'] = logged_in_profile
-            if logged_in_profile != profile_obj:
-                context['is_following_profile'] = logged_in_profile.is_following(profile_obj)
+            if logged_in_profile.pk != profile_page['pk']:
+                context['is_following_profile'] = Follow.objects.filter(
+                    profile_id=profile_page['pk'], follower_profile=logged_in_profile).exists()
         except Profile.DoesNotExist:
             pass
 
@@ -73,30 +105,35 @@ class PostDetailView(DetailView):
     template_name = 'mini_insta/show_post.html'
     context_object_name = 'post'
 
+    def get_logged_in_profile(self):
+        """Get the logged in user's profile, once per request.
+        Returns: Profile object or None
+        """
+        if not hasattr(self, 'logged_in_profile'):
+            self.logged_in_profile = None
+            if self.request.user.is_authenticated:
+                self.logged_in_profile = Profile.objects.filter(user=self.request.user).first()
+        return self.logged_in_profile
+
+    def get_queryset(self):
+        """Get the post with its like state for the viewer.
+        Returns: QuerySet of Post objects
+        """
+        return Post.objects.with_summary(self.get_logged_in_profile())
+
     def get_context_data(self, **kwargs):
         """Add logged in profile to context.
         Returns: context dictionary
         """
         context = super().get_context_data(**kwargs)
-        context.setdefault('logged_in_profile', None)
-        context.setdefault('can_like_post', False)
-        context.setdefault('has_liked_post', False)
-
-        # add the logged in user's profile if authenticated
-        if self.request.user.is_authenticated:
-            try:
-                logged_in_profile = Profile.objects.get(user=self.request.user)
-                context['logged_in_profile'] = logged_in_profile
-                # user can like if viewing someone else's post
-                context['can_like_post'] = (
-                    logged_in_profile is not None and
-                    self.object.profile != logged_in_profile
-                )
-                if context['can_like_post']:
-                    context['has_liked_post'] = self.object.is_liked_by(logged_in_profile)
-            except Profile.DoesNotExist:
-                pass
-
+        logged_in_profile = self.get_logged_in_profile()
+        context['logged_in_profile'] = logged_in_profile
+        # user can like if viewing someone else's post
+        context['can_like_post'] = (
+            logged_in_profile is not None and
+            self.object.profile_id != logged_in_profile.pk
+        )
+        context['has_liked_post'] = context['can_like_post'] and self.object.liked_by_viewer
         return context
 
 class CreatePostView(AuthenticatedView, CreateView):
@@ -192,6 +229,15 @@ class ShowOwnProfileView(AuthenticatedView, DetailView):
         # get the profile for the logged in user
         return self.get_profile_for_user()
 
+    def get_context_data(self, **kwargs):
+        """Add the cached header and post grid.
+        Returns: context dictionary
+        """
+        context = super().get_context_data(**kwargs)
+        context['profile_page'] = get_profile_page(self.object.pk)
+        context['logged_in_profile'] = self.object
+        return context
+
 class ShowFollowersDetailView(DetailView):
     """View to display followers of a profile."""
     model = Profile
@@ -205,34 +251,80 @@ class ShowFollowingDetailView(DetailView):
     context_object_name = 'profile'
 
 class PostFeedListView(AuthenticatedView, ListView):
-    """View to display the post feed for a profile."""
+    """View to display the post feed for a profile, one page at a time."""
     model = Post
     template_name = 'mini_insta/show_feed.html'
     context_object_name = 'posts'
 
     def get_queryset(self):
-        """Get the post feed for the profile.
-        Returns: QuerySet of Post objects
+        """Get one page of the post feed for the profile.
+        Returns: list of Post objects
         """
         # get the profile for the logged in user
         profile = self.get_profile_for_user()
-        # use the get_post_feed method we created
-        return profile.get_post_feed()
+        # an invalid cursor falls back to the newest posts
+        posts, self.next_cursor = get_feed_page(profile, self.request.GET.get('cursor'))
+        return posts
 
     def get_context_data(self, **kwargs):
-        """Add profile to context.
+        """Add profile and next page cursor to context.
         Returns: context dictionary
         """
         context = super().get_context_data(**kwargs)
         # add the profile to context for template use
         context['profile'] = self.get_profile_for_user()
+        context['next_cursor'] = self.next_cursor
         return context
 
+def post_card(post):
+    """Describe a post annotated by with_summary for the JSON feed.
+    Returns: dictionary
+    """
+    card = {
+        'id': post.pk,
+        'url': post.get_absolute_url(),
+        'timestamp': post.timestamp.isoformat(),
+        'caption': post.caption,
+        'cover_url': post.get_cover_url(600),
+        'cover_srcset': post.get_cover_srcset(),
+        'photo_count': post.photo_count,
+        'like_count': post.like_count,
+        'comment_count': post.comment_count,
+        'liked_by_viewer': post.liked_by_viewer,
+        'first_comment': None,
+        'profile': {
+            'id': post.profile.pk,
+            'url': post.profile.get_absolute_url(),
+            'username': post.profile.username,
+            'display_name': post.profile.display_name,
+            'image_url': post.profile.profile_image_url,
+        },
+    }
+    if post.first_comment_text is not None:
+        card['first_comment'] = {'author': post.first_comment_author,
+                                 'text': post.first_comment_text}
+    return card
+
+class PostFeedJSONView(AuthenticatedView, View):
+    """View returning pages of the post feed as JSON, for infinite scrolling."""
+
+    def get(self, request):
+        """Return one page of post cards and the cursor of the next page.
+        Returns: JsonResponse, status 400 for an invalid cursor
+        """
+        cursor = request.GET.get('cursor')
+        if cursor and decode_feed_cursor(cursor) is None:
+            return JsonResponse({'error': 'invalid cursor'}, status=400)
+        posts, next_cursor = get_feed_page(self.get_profile_for_user(), cursor)
+        return JsonResponse({'posts': [post_card(post) for post in posts],
+                             'next_cursor': next_cursor or None})
+
 class SearchView(AuthenticatedView, ListView):
     """View to handle search functionality."""
     model = Post
     template_name = 'mini_insta/search_results.html'
     context_object_name = 'posts'
+    paginate_by = 10
 
     def dispatch(self, request, *args, **kwargs):
         """Handle initial request dispatch.
@@ -248,14 +340,17 @@ class SearchView(AuthenticatedView, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        """Get posts matching the search query.
-        Returns: QuerySet of Post objects
+        """Get posts matching the search query, best match first.
+        An empty query lists every post, as it always has.
+        Returns: SearchResults or QuerySet of Post objects, for the paginator
         """
         # get the search query
         query = self.request.GET.get('query', '')
-        # search for posts with query in caption
-        posts = Post.objects.filter(caption__icontains=query)
-        return posts
+        posts = Post.objects.with_summary(self.get_profile_for_user())
+        if not query.strip():
+            return posts.order_by('pk')
+        # rank posts by caption in the full text index
+        return SearchResults(posts, query)
 
     def get_context_data(self, **kwargs):
         """Add additional context data.
@@ -266,18 +361,19 @@ class SearchView(AuthenticatedView, ListView):
         profile = self.get_profile_for_user()
         query = self.request.GET.get('query', '')
 
-        # search for matching profiles
-        profiles = Profile.objects.filter(
-            models.Q(username__icontains=query) |
-            models.Q(display_name__icontains=query) |
-            models.Q(bio_text__icontains=query)
-        )
+        # matching profiles are paged separately from the posts, and an
+        # empty query lists them all
+        profiles = Profile.objects.order_by('pk')
+        if query.strip():
+            profiles = SearchResults(profiles, query)
+        profiles = Paginator(profiles, self.paginate_by)
+        profile_page = profiles.get_page(self.request.GET.get('profile_page'))
 
         # add to context
         context['profile'] = profile
         context['query'] = query
-        context['profiles'] = profiles
-        # posts are already in context from get_queryset
+        context['profiles'] = profile_page
+        # posts are already in context from get_queryset, with page_obj
 
         return context
 
@@ -9,4 +9,8 @@ from django.apps import AppConfig
 class VoterAnalyticsConfig(AppConfig):
     """Configuration class for the voter_analytics app."""
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'voter_analytics'
\ No newline at end of file
+    name = 'voter_analytics'
+
+    def ready(self):
+        """Connect the signal handlers."""
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,96 @@
+# File: charts.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Plotly figure specs for the voter_analytics graphs page, cached
+# as pre-serialized JSON
+
+from asgiref.sync import sync_to_async
+from .filters import result_cache
+from .models import get_data_version
+from .stats import filtered_graph_data_async
+
+
+def build_figures(data):
+    """Build the three graphs page figures.
+    Args: data - graph data from stats.graph_data
+    Returns: dict of plotly Figure objects
+    """
+    # import plotly for graphing
+    import plotly.graph_objects as go
+
+    # Graph 1: Birth Year Distribution
+    sorted_years = [year for year, count in data['birth_years']]
+    year_counts = [count for year, count in data['birth_years']]
+
+    # create the birth year histogram
+    fig_birth = go.Figure(data=[
+        go.Bar(x=sorted_years, y=year_counts)
+    ])
+    fig_birth.update_layout(
+        title='Voter Distribution by Year of Birth',
+        xaxis_title='Year of Birth',
+        yaxis_title='Number of Voters',
+        showlegend=False
+    )
+
+    # Graph 2: Party Affiliation Pie Chart
+    parties = [party for party, count in data['parties']]
+    counts = [count for party, count in data['parties']]
+
+    # create the pie chart
+    fig_party = go.Figure(data=[
+        go.Pie(labels=parties, values=counts)
+    ])
+    fig_party.update_layout(
+        title='Voter Distribution by Party Affiliation'
+    )
+
+    # Graph 3: Election Participation
+    election_data = dict(data['elections'])
+
+    # create the election participation bar chart
+    fig_elections = go.Figure(data=[
+        go.Bar(x=list(election_data.keys()), y=list(election_data.values()))
+    ])
+    fig_elections.update_layout(
+        title='Voter Participation by Election',
+        xaxis_title='Election',
+        yaxis_title='Number of Voters',
+        showlegend=False
+    )
+
+    return {'birth_year': fig_birth, 'party': fig_party, 'elections': fig_elections}
+
+
+def figures_to_json(figures):
+    """Serialize figures into one compact JSON object of figure specs.
+
+    The default template is dropped, since plotly.js applies its own
+    defaults and the template is most of the payload.
+    Returns: JSON string
+    """
+    import plotly.io as pio
+
+    parts = []
+    for name, fig in figures.items():
+        fig.update_layout(template=None)
+        parts.append(f'"{name}":{pio.to_json(fig, validate=False, pretty=False)}')
+    return '{' + ','.join(parts) + '}'
+
+
+async def graph_figures_json_async(voter_filter):
+    """Figure specs for a VoterFilter as a JSON string, cached per data version.
+
+    A repeat request for the same filter builds no figures and runs no
+    aggregate queries. Otherwise the aggregates run concurrently, and the
+    figures are built and serialized in a worker thread so the event loop
+    stays free.
+    """
+    async def compute():
+        data = await filtered_graph_data_async(voter_filter)
+        render = sync_to_async(lambda: figures_to_json(build_figures(data)),
+                               thread_sensitive=False)
+        return await render()
+
+    version = await sync_to_async(get_data_version)()
+    return await result_cache.aget_or_compute('figures_json', voter_filter, version, compute)
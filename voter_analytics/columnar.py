@@ -0,0 +1,138 @@
+# File: columnar.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Optional in-process analytics engine holding the Voter table as
+# NumPy column arrays. Enabled with VOTER_ANALYTICS_ENGINE = 'columnar'.
+
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the ORM path works without it
+    np = None
+
+from .models import ELECTION_FIELDS, Voter, get_data_version
+from .stats import ELECTION_LABELS
+
+# rows read from the database per round trip while loading
+LOAD_CHUNK_SIZE = 10000
+
+
+class ColumnarVoters:
+    """The filterable Voter columns as NumPy arrays.
+
+    Answers the same questions as the ORM path in stats.py (counts and
+    graph data for a VoterFilter) with vectorized boolean masks and
+    bincount, without touching the database.
+    """
+
+    def __init__(self, parties, party_code, birth_year, voter_score, mask, version=None):
+        """Store the column arrays.
+        Args: parties - sorted list of party values; party_code indexes it
+              party_code, birth_year, voter_score, mask - equal length arrays
+              version - data version the arrays were loaded from
+        """
+        self.parties = parties
+        self.party_code = party_code
+        self.birth_year = birth_year
+        self.voter_score = voter_score
+        self.mask = mask
+        self.version = version
+
+    def __len__(self):
+        return len(self.birth_year)
+
+    @classmethod
+    def from_queryset(cls, voters, version=None):
+        """Load the columns from a Voter QuerySet in one streaming pass.
+        Returns: ColumnarVoters
+        """
+        rows = (voters.order_by().values_list('party_affiliation', 'birth_year',
+                                              'voter_score', 'participation_mask')
+                      .iterator(chunk_size=LOAD_CHUNK_SIZE))
+        codes = {}
+        party, year, score, mask = [], [], [], []
+        for p, y, s, m in rows:
+            party.append(codes.setdefault(p, len(codes)))
+            year.append(y)
+            score.append(s)
+            mask.append(m)
+
+        # renumber the party codes so they follow sorted party order
+        parties = sorted(codes)
+        remap = np.zeros(max(len(codes), 1), dtype=np.int16)
+        for name, code in codes.items():
+            remap[code] = parties.index(name)
+
+        return cls(
+            parties=parties,
+            party_code=remap[np.asarray(party, dtype=np.int16)],
+            birth_year=np.asarray(year, dtype=np.int16),
+            voter_score=np.asarray(score, dtype=np.int8),
+            mask=np.asarray(mask, dtype=np.uint16),
+            version=version,
+        )
+
+    def select(self, voter_filter):
+        """Boolean array of the rows matching a VoterFilter."""
+        selected = np.ones(len(self), dtype=bool)
+        if voter_filter.party:
+            if voter_filter.party not in self.parties:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.party_code == self.parties.index(voter_filter.party)
+        if voter_filter.min_year is not None:
+            selected &= self.birth_year >= voter_filter.min_year
+        if voter_filter.max_year is not None:
+            selected &= self.birth_year <= voter_filter.max_year
+        if voter_filter.voter_score is not None:
+            selected &= self.voter_score == voter_filter.voter_score
+        if voter_filter.elections:
+            wanted = 0
+            for election in voter_filter.elections:
+                wanted |= 1 << ELECTION_FIELDS.index(election)
+            selected &= (self.mask & wanted) == wanted
+        return selected
+
+    def count(self, voter_filter):
+        """Number of voters matching a VoterFilter."""
+        return int(np.count_nonzero(self.select(voter_filter)))
+
+    def graph_data(self, voter_filter):
+        """Graph data for a VoterFilter, in the same shape as stats.graph_data."""
+        selected = self.select(voter_filter)
+        years = self.birth_year[selected]
+        masks = self.mask[selected]
+
+        birth_years = []
+        if len(years):
+            low = int(years.min())
+            counts = np.bincount(years - low)
+            birth_years = [(low + i, int(c)) for i, c in enumerate(counts) if c]
+
+        party_counts = np.bincount(self.party_code[selected], minlength=len(self.parties))
+        parties = [(name, int(c)) for name, c in zip(self.parties, party_counts) if c]
+
+        elections = [(ELECTION_LABELS[e], int(np.count_nonzero(masks & (1 << bit))))
+                     for bit, e in enumerate(ELECTION_FIELDS)]
+
+        return {'birth_years': birth_years, 'parties': parties, 'elections': elections}
+
+
+# the engine for the current data version, shared by every request
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_columnar_voters():
+    """Get the columnar engine for the current data, reloading it after an import.
+    Returns: ColumnarVoters, or None if numpy is not installed
+    """
+    global _engine
+    if np is None:
+        return None
+
+    version = get_data_version()
+    with _engine_lock:
+        if _engine is None or _engine.version != version:
+            _engine = ColumnarVoters.from_queryset(Voter.objects.all(), version)
+        return _engine
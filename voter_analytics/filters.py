@@ -0,0 +1,171 @@
+# File: filters.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Normalized voter filter signatures and an in-memory LRU cache of
+# results keyed by them, shared by every view that uses the filter form
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from .parsing import ELECTION_FIELDS
+
+
+def _parse_int(value):
+    """Parse an integer form value, treating blank or bad input as no filter."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class VoterFilter:
+    """Normalized, hashable form of the voter filter form parameters.
+
+    Two requests that select the same voters get equal filters no matter
+    how their query strings are written, so they share cached results.
+    """
+    party: str = ''
+    min_year: int = None
+    max_year: int = None
+    voter_score: int = None
+    elections: tuple = ()
+
+    @classmethod
+    def from_params(cls, params):
+        """Build a filter from GET parameters.
+        Args: params - QueryDict or dict with party, min_dob, max_dob,
+              voter_score and the election checkbox names
+        Returns: VoterFilter
+        """
+        return cls(
+            party=params.get('party') or '',
+            min_year=_parse_int(params.get('min_dob')),
+            max_year=_parse_int(params.get('max_dob')),
+            voter_score=_parse_int(params.get('voter_score')),
+            # always in ELECTION_FIELDS order
+            elections=tuple(e for e in ELECTION_FIELDS if params.get(e)),
+        )
+
+    def apply(self, queryset):
+        """Filter a Voter or VoterRollup QuerySet.
+        Returns: filtered QuerySet
+        """
+        if self.party:
+            queryset = queryset.filter(party_affiliation=self.party)
+
+        # filter on the stored birth year so the column can use an index
+        if self.min_year is not None:
+            queryset = queryset.filter(birth_year__gte=self.min_year)
+        if self.max_year is not None:
+            queryset = queryset.filter(birth_year__lte=self.max_year)
+
+        if self.voter_score is not None:
+            queryset = queryset.filter(voter_score=self.voter_score)
+
+        # filter by specific elections with a single mask predicate
+        if self.elections:
+            queryset = queryset.voted_in_all(*self.elections)
+
+        return queryset
+
+    @property
+    def signature(self):
+        """Short stable string identifying this filter, for cache keys."""
+        return hashlib.sha1(repr(self).encode()).hexdigest()
+
+
+# marks a cache miss, since None can be a cached result
+_MISSING = object()
+
+
+class FilterResultCache:
+    """Thread-safe LRU cache of per-filter results with hit/miss counters.
+
+    Keys combine a result kind (such as 'count'), the filter and the data
+    version, so an import makes every old entry unreachable and LRU
+    eviction clears them out.
+    """
+
+    def __init__(self, maxsize=256):
+        """Create an empty cache holding at most maxsize results."""
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kind, voter_filter, version, default=None):
+        """Look up a result, counting the hit or miss.
+        Args: kind - name of the kind of result
+              voter_filter - VoterFilter the result is for
+              version - data version from get_data_version()
+        Returns: the cached result, or default
+        """
+        key = (kind, voter_filter, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, kind, voter_filter, version, result):
+        """Store a result, evicting the least recently used ones over maxsize."""
+        key = (kind, voter_filter, version)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, kind, voter_filter, version, compute):
+        """Return the cached result, or compute and store it.
+        Args: kind, voter_filter, version - as for get()
+              compute - function called with no arguments on a miss
+        """
+        result = self.get(kind, voter_filter, version, _MISSING)
+        if result is _MISSING:
+            # compute outside the lock so slow queries don't block other threads
+            result = compute()
+            self.put(kind, voter_filter, version, result)
+        return result
+
+    async def aget_or_compute(self, kind, voter_filter, version, compute):
+        """Async version of get_or_compute, awaiting compute() on a miss."""
+        result = self.get(kind, voter_filter, version, _MISSING)
+        if result is _MISSING:
+            result = await compute()
+            self.put(kind, voter_filter, version, result)
+        return result
+
+    def info(self):
+        """Get cache metrics.
+        Returns: dict with hits, misses, evictions, size, maxsize and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# process-wide cache used by the voter views
+result_cache = FilterResultCache(getattr(settings, 'VOTER_RESULT_CACHE_SIZE', 256))
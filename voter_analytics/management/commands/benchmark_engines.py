@@ -0,0 +1,112 @@
+# File: benchmark_engines.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command comparing the ORM, rollup and NumPy columnar
+# paths for the graphs page and voter count queries
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from voter_analytics.columnar import ColumnarVoters, np
+from voter_analytics.filters import VoterFilter
+from voter_analytics.models import Voter, VoterRollup, delete_voters, finish_import
+from voter_analytics.parsing import parse_voter_row
+from voter_analytics.stats import graph_data
+from voter_analytics.synthetic import synthetic_rows
+
+# filter combinations timed for each engine
+BENCHMARK_FILTERS = [
+    {},
+    {'party': 'D '},
+    {'min_dob': '1960', 'max_dob': '1980'},
+    {'party': 'R ', 'voter_score': '5'},
+    {'v20state': 'true', 'v22general': 'true'},
+    {'party': 'U ', 'min_dob': '1970', 'v23town': 'true'},
+]
+
+
+def synthetic_voters(count, seed=412):
+    """Yield unsaved Voter objects built from synthetic Newton-shaped rows."""
+    for row in synthetic_rows(count, seed):
+        yield Voter(**parse_voter_row(row))
+
+
+class Command(BaseCommand):
+    """Time graph data and counts on each analytics engine."""
+    help = 'Compare the ORM, rollup and NumPy columnar engines.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--rows', type=int, default=0,
+                            help='benchmark on this many synthetic voters inserted '
+                                 'in a transaction that is rolled back afterwards')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='timed runs per filter and engine')
+        parser.add_argument('--output', help='write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        if np is None:
+            raise CommandError('numpy is not installed, so the columnar engine is unavailable.')
+
+        with transaction.atomic():
+            if options['rows']:
+                self.stdout.write(f"Inserting {options['rows']} synthetic voters...")
+                # plain DELETE and one rebuild of the derived tables, as load_data
+                # does, rather than a post_delete signal per existing voter
+                delete_voters()
+                Voter.objects.bulk_create(synthetic_voters(options['rows']), batch_size=5000)
+                finish_import('benchmark', options['rows'])
+
+            results = self.run(options['repeat'])
+
+            # never keep the synthetic rows
+            transaction.set_rollback(bool(options['rows']))
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    def time(self, func, repeat):
+        """Best wall time of repeat calls, in milliseconds."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return round(best, 3)
+
+    def run(self, repeat):
+        """Time every filter on every engine and print a table."""
+        rows = Voter.objects.count()
+        start = time.perf_counter()
+        engine = ColumnarVoters.from_queryset(Voter.objects.all())
+        load_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.stdout.write(f"{rows} voters; columnar load took {load_ms} ms")
+
+        results = {'rows': rows, 'columnar_load_ms': load_ms, 'filters': []}
+        for params in BENCHMARK_FILTERS:
+            voter_filter = VoterFilter.from_params(params)
+            voters = voter_filter.apply(Voter.objects.all())
+            rollup = voter_filter.apply(VoterRollup.objects.all())
+
+            # the engines must agree before their timings mean anything
+            expected = graph_data(voters)
+            if engine.graph_data(voter_filter) != expected:
+                raise CommandError(f'columnar engine disagrees with the ORM for {params}')
+
+            timings = {
+                'orm_graph_ms': self.time(lambda: graph_data(voters), repeat),
+                'rollup_graph_ms': self.time(lambda: graph_data(rollup, rollup=True), repeat),
+                'columnar_graph_ms': self.time(lambda: engine.graph_data(voter_filter), repeat),
+                'orm_count_ms': self.time(lambda: voters.count(), repeat),
+                'columnar_count_ms': self.time(lambda: engine.count(voter_filter), repeat),
+            }
+            results['filters'].append({'filters': params, **timings})
+            self.stdout.write(f"{str(params):55} " + '  '.join(
+                f"{name[:-3]}={ms:.2f}ms" for name, ms in timings.items()))
+
+        return results
@@ -0,0 +1,199 @@
+# File: benchmark_voters.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command timing the voter import and the main
+# voter_analytics pages, writing JSON results that can be compared across commits
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from voter_analytics.filters import result_cache
+from voter_analytics.models import Voter, load_data
+from voter_analytics.synthetic import write_synthetic_csv
+from voter_analytics.views import (GraphDataView, GraphsView, VoterDetailView,
+                                   VoterListView)
+
+# graphs page filters, from no filter to the most selective
+GRAPH_FILTERS = {
+    'all': {},
+    'party': {'party': 'D '},
+    'years': {'min_dob': '1960', 'max_dob': '1980'},
+    'party_score_years': {'party': 'R ', 'voter_score': '5', 'min_dob': '1950'},
+    'elections': {'v21primary': 'true', 'v23town': 'true'},
+}
+
+# voters whose detail pages are timed
+DETAIL_SAMPLES = 20
+
+
+def git_commit():
+    """Get the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Benchmark load_data and the voter list, graphs and detail pages.
+
+    Runs against a throwaway copy of the database created the same way the
+    test runner creates one, so the real voter data is never touched.
+    """
+    help = 'Time the voter import and pages on a CSV or synthetic data and write JSON results.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--file', help='voter CSV or snapshot to load; '
+                                           'by default a synthetic file is generated')
+        parser.add_argument('--rows', type=int, default=100_000,
+                            help='size of the generated synthetic file')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='random seed for the synthetic file')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='timed runs of each page')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='CSV parsing processes used by load_data')
+        parser.add_argument('--output', help='write the results as JSON to this file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        """Set up a scratch database, run every benchmark and report."""
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        filename = options['file']
+        if filename is None:
+            handle, filename = tempfile.mkstemp(suffix='.csv')
+            os.close(handle)
+            self.stdout.write(f"Generating {options['rows']} synthetic voters...")
+            write_synthetic_csv(filename, options['rows'], options['seed'])
+        elif not os.path.exists(filename):
+            raise CommandError(f'{filename} does not exist')
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(filename, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if options['file'] is None:
+                os.remove(filename)
+
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'file': options['file'] or f"synthetic rows={options['rows']} seed={options['seed']}",
+            'rows': results.pop('rows'),
+            'results': results,
+        }
+        self.print_report(report, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def timed(self, func, repeat, before=None):
+        """Time repeat calls of func.
+        Args: before - called, untimed, ahead of each run, e.g. to clear caches
+        Returns: dict with best_ms, median_ms and runs
+        """
+        times = []
+        for _ in range(repeat):
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000)
+        return {'best_ms': round(min(times), 3),
+                'median_ms': round(statistics.median(times), 3),
+                'runs': repeat}
+
+    def render(self, view, path, params=None, **kwargs):
+        """Run a view on a GET request and render its response, as a server would."""
+        request = RequestFactory().get(path, params or {})
+        if view.view_class.view_is_async:
+            response = async_to_sync(view)(request, **kwargs)
+        else:
+            response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def clear_caches(self):
+        """Empty the result and metadata caches, for cold timings."""
+        result_cache.clear()
+        cache.clear()
+
+    def run(self, filename, options):
+        """Run every benchmark against the scratch database.
+        Returns: dict of benchmark name to timings, plus rows
+        """
+        repeat = options['repeat']
+        results = {}
+
+        # loading runs once; it replaces the table, so repeats would all be alike
+        self.stdout.write(f'Loading {filename}...')
+        start = time.perf_counter()
+        rows = load_data(filename, verbose=False, workers=options['workers'])
+        elapsed = time.perf_counter() - start
+        results['rows'] = rows
+        results['load_data'] = {'best_ms': round(elapsed * 1000, 3),
+                                'median_ms': round(elapsed * 1000, 3), 'runs': 1,
+                                'rows_per_second': round(rows / elapsed) if elapsed else None}
+
+        list_view = VoterListView.as_view()
+        first = self.render(list_view, '/')
+        last_cursor = first.context_data['page_obj'].last_cursor
+        results['list_first_page'] = self.timed(lambda: self.render(list_view, '/'), repeat)
+        results['list_last_page'] = self.timed(
+            lambda: self.render(list_view, '/', {'cursor': last_cursor}), repeat)
+        results['list_filtered_first_page'] = self.timed(
+            lambda: self.render(list_view, '/', GRAPH_FILTERS['party_score_years']), repeat)
+
+        graphs_view = GraphsView.as_view()
+        data_view = GraphDataView.as_view()
+        results['graphs_page'] = self.timed(lambda: self.render(graphs_view, '/graphs'), repeat)
+        for name, params in GRAPH_FILTERS.items():
+            results[f'graph_data_{name}_cold'] = self.timed(
+                lambda: self.render(data_view, '/graphs/data', params), repeat,
+                before=self.clear_caches)
+            results[f'graph_data_{name}_warm'] = self.timed(
+                lambda: self.render(data_view, '/graphs/data', params), repeat)
+
+        detail_view = VoterDetailView.as_view()
+        pks = list(Voter.objects.order_by('?').values_list('pk', flat=True)[:DETAIL_SAMPLES])
+        results['voter_detail'] = self.timed(
+            lambda: [self.render(detail_view, f'/voter/{pk}', pk=pk) for pk in pks], repeat)
+        results['voter_detail']['pages_per_run'] = len(pks)
+
+        return results
+
+    def print_report(self, report, baseline):
+        """Print one line per benchmark, with the change from the baseline if given."""
+        self.stdout.write(f"{report['rows']} voters, commit {report['commit']}")
+        previous = baseline['results'] if baseline else {}
+        for name, timing in report['results'].items():
+            line = f"{name:34} best {timing['best_ms']:10.2f} ms  median {timing['median_ms']:10.2f} ms"
+            if name in previous and previous[name]['median_ms']:
+                ratio = timing['median_ms'] / previous[name]['median_ms']
+                line += f"  {ratio:5.2f}x vs {baseline['commit']}"
+            self.stdout.write(line)
@@ -0,0 +1,74 @@
+# File: explain_voter_queries.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command that records the query plan for each common
+# voter filter combination, to check that none of them scans the whole table
+
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from voter_analytics.models import Voter
+
+# filter form combinations people actually use
+COMMON_FILTERS = [
+    {'party': 'D '},
+    {'min_dob': '1960'},
+    {'min_dob': '1960', 'max_dob': '1980'},
+    {'voter_score': '3'},
+    {'party': 'D ', 'min_dob': '1960', 'max_dob': '1980'},
+    {'party': 'R ', 'voter_score': '5'},
+    {'voter_score': '5', 'min_dob': '1950', 'max_dob': '1970'},
+    {'party': 'U ', 'voter_score': '0', 'min_dob': '1990'},
+    {'v21primary': 'true', 'v23town': 'true'},
+    {'v21primary': 'true', 'min_dob': '1980'},
+]
+
+# a plan line that reads the whole voter table without an index
+FULL_SCAN = re.compile(r'\bSCAN %s\b(?!.*\bINDEX\b)' % Voter._meta.db_table)
+
+
+class Command(BaseCommand):
+    """Print EXPLAIN output for the voter list and graph queries."""
+    help = 'Record the query plan for each common voter filter combination.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--output', help='write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        """Explain every query and report the ones that scan the table."""
+        results = []
+        for params in COMMON_FILTERS:
+            voters = Voter.objects.filter_by_params(params)
+            queries = {
+                # one page of the voter list
+                'list': voters.order_by('last_name', 'first_name')[:100],
+                # the birth year histogram on the graphs page
+                'histogram': voters.values('birth_year').annotate(count=Count('id')),
+            }
+            for name, queryset in queries.items():
+                start = time.perf_counter()
+                list(queryset)
+                elapsed = time.perf_counter() - start
+                plan = queryset.explain()
+                results.append({
+                    'filters': params,
+                    'query': name,
+                    'seconds': round(elapsed, 6),
+                    'plan': plan.splitlines(),
+                    'full_scan': bool(FULL_SCAN.search(plan)),
+                })
+
+        for result in results:
+            label = 'FULL SCAN' if result['full_scan'] else 'ok'
+            self.stdout.write(f"[{label}] {result['query']} {result['filters']} "
+                              f"({result['seconds'] * 1000:.2f} ms)")
+            for line in result['plan']:
+                self.stdout.write(f"    {line}")
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
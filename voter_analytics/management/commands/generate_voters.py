@@ -0,0 +1,30 @@
+# File: generate_voters.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command to write a synthetic Newton-shaped voter CSV
+
+import time
+
+from django.core.management.base import BaseCommand
+from voter_analytics.synthetic import write_synthetic_csv
+
+
+class Command(BaseCommand):
+    """Write a synthetic voter CSV of any size for benchmarking."""
+    help = 'Write a synthetic voter CSV with the columns and quirks of the Newton file.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--rows', type=int, default=100_000,
+                            help='number of voters to write, e.g. 100000, 1000000, 10000000')
+        parser.add_argument('--output', default='synthetic_voters.csv',
+                            help='path of the CSV to write')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='random seed; the same seed and size give the same file')
+
+    def handle(self, *args, **options):
+        """Stream the rows to the output file."""
+        start = time.monotonic()
+        rows = write_synthetic_csv(options['output'], options['rows'], options['seed'])
+        self.stdout.write(f"Wrote {rows} voters to {options['output']} "
+                          f"in {time.monotonic() - start:.1f}s.")
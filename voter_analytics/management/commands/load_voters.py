@@ -0,0 +1,37 @@
+# File: load_voters.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command to stream the Newton voter CSV into the database
+
+from django.core.management.base import BaseCommand, CommandError
+from voter_analytics.models import load_data, sync_data, VOTER_CSV, LOAD_BATCH_SIZE
+from voter_analytics.snapshot import SnapshotError
+
+
+class Command(BaseCommand):
+    """Load voters from a CSV file in fixed-size batches."""
+    help = 'Stream voter records from a CSV file into the database.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--file', default=VOTER_CSV,
+                            help='path to the voter CSV file or binary snapshot')
+        parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE,
+                            help='number of rows written per bulk insert')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='number of processes used to parse the CSV')
+        parser.add_argument('--incremental', action='store_true',
+                            help='only apply inserts, updates and deletes '
+                                 'instead of reloading every row')
+        parser.add_argument('--trust-snapshot', action='store_true',
+                            help='load a snapshot without comparing it to the CSV it '
+                                 'was built from, e.g. to restore it on its own')
+
+    def handle(self, *args, **options):
+        """Run the streaming or incremental import."""
+        import_data = sync_data if options['incremental'] else load_data
+        try:
+            import_data(filename=options['file'], batch_size=options['batch_size'],
+                        workers=options['workers'], trust_snapshot=options['trust_snapshot'])
+        except SnapshotError as e:
+            raise CommandError(str(e))
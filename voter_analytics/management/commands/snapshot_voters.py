@@ -0,0 +1,44 @@
+# File: snapshot_voters.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Management command to convert the voter CSV into a binary snapshot
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from voter_analytics.models import VOTER_CSV
+from voter_analytics.snapshot import SnapshotError, VoterSnapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    """Write, or check, a binary snapshot of the voter CSV.
+
+    Load a snapshot with: python manage.py load_voters --file <snapshot>
+    """
+    help = 'Convert the voter CSV into a binary snapshot for fast reloads.'
+
+    def add_arguments(self, parser):
+        """Add command line options."""
+        parser.add_argument('--file', default=VOTER_CSV,
+                            help='path to the voter CSV file')
+        parser.add_argument('--output', default=os.path.splitext(VOTER_CSV)[0] + '.snap',
+                            help='path of the snapshot to write')
+        parser.add_argument('--check', action='store_true',
+                            help='verify the existing snapshot instead of writing one')
+
+    def handle(self, *args, **options):
+        """Write the snapshot, or check its checksums and freshness."""
+        if options['check']:
+            try:
+                with VoterSnapshot(options['output'], source=options['file']) as snapshot:
+                    self.stdout.write(f"{options['output']} is valid ({snapshot.rows} voters).")
+            except SnapshotError as e:
+                raise CommandError(str(e))
+            return
+
+        start = time.monotonic()
+        rows = write_snapshot(options['file'], options['output'])
+        size = os.path.getsize(options['output'])
+        self.stdout.write(f"Wrote {rows} voters to {options['output']} "
+                          f"({size / 1024:.0f} KiB) in {time.monotonic() - start:.1f}s.")
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:23
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+
+
+def fill_birth_year(apps, schema_editor):
+    """Copy the year out of date_of_birth for voters loaded before this field existed."""
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    Voter.objects.update(birth_year=ExtractYear('date_of_birth'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='birth_year',
+            field=models.IntegerField(default=1900),
+        ),
+        migrations.RunPython(fill_birth_year, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['birth_year'], name='voter_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['party_affiliation', 'birth_year'], name='voter_party_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['voter_score', 'birth_year'], name='voter_score_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['party_affiliation', 'voter_score', 'birth_year'], name='voter_party_score_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['precinct_number'], name='voter_precinct_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:24
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+ELECTION_FIELDS = ('v20state', 'v21town', 'v21primary', 'v22general', 'v23town')
+
+
+def fill_participation_mask(apps, schema_editor):
+    """Pack the existing election flags into participation_mask."""
+    Voter = apps.get_model('voter_analytics', 'Voter')
+    mask = Value(0)
+    for bit, election in enumerate(ELECTION_FIELDS):
+        mask = mask + Case(When(**{election: True}, then=Value(1 << bit)), default=Value(0))
+    Voter.objects.update(participation_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0002_voter_birth_year_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='participation_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_participation_mask, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['participation_mask', 'birth_year'], name='voter_mask_year_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0003_voter_participation_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoterRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_affiliation', models.CharField(max_length=2)),
+                ('birth_year', models.IntegerField()),
+                ('voter_score', models.IntegerField()),
+                ('participation_mask', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField()),
+            ],
+        ),
+    ]
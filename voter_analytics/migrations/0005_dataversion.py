@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:27
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0004_voterrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('source', models.CharField(max_length=20)),
+                ('rows', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0006_voter_name_idx'),
+    ]
+
+    operations = [
+        # FTS5 table keyed by voter id, with prefix indexes for search-as-you-type
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE voter_analytics_voter_fts USING fts5("
+                "last_name, first_name, street_name, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+                "INSERT INTO voter_analytics_voter_fts (rowid, last_name, first_name, street_name) "
+                "SELECT id, last_name, first_name, street_name FROM voter_analytics_voter",
+            ],
+            reverse_sql="DROP TABLE voter_analytics_voter_fts",
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0007_voter_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Household',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precinct_number', models.CharField(max_length=10)),
+                ('street_name', models.CharField(max_length=100)),
+                ('street_number', models.CharField(max_length=20)),
+                ('apartment_number', models.CharField(blank=True, max_length=20)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('voter_count', models.IntegerField()),
+                ('avg_voter_score', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrecinctStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precinct_number', models.CharField(max_length=10, unique=True)),
+                ('voter_count', models.IntegerField()),
+                ('household_count', models.IntegerField()),
+                ('avg_voter_score', models.FloatField()),
+                ('party_counts', models.JSONField(default=dict)),
+                ('election_counts', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name_plural': 'precinct stats',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='voter',
+            name='voter_precinct_idx',
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['precinct_number', 'street_name', 'street_number', 'apartment_number'], name='voter_canvass_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='household',
+            index=models.Index(fields=['precinct_number', 'street_name', 'street_number', 'apartment_number'], name='household_canvass_idx'),
+        ),
+    ]
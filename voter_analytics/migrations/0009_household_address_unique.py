@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0008_household_precinctstats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='household',
+            name='household_canvass_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='household',
+            constraint=models.UniqueConstraint(fields=('precinct_number', 'street_name', 'street_number', 'apartment_number', 'zip_code'), name='household_address_unique'),
+        ),
+    ]
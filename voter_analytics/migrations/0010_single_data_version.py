@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:08
+
+from django.db import migrations, models
+
+
+def keep_latest_version(apps, schema_editor):
+    """Drop every data version row but the newest, which bump_data_version now rewrites."""
+    DataVersion = apps.get_model('voter_analytics', 'DataVersion')
+    latest = DataVersion.objects.order_by('-pk').values_list('pk', flat=True).first()
+    DataVersion.objects.exclude(pk=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0009_household_address_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataversion',
+            name='timestamp',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(keep_latest_version, migrations.RunPython.noop),
+    ]
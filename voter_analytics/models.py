@@ -3,9 +3,78 @@
 # Date: October 2025
 # Description: Models for voter_analytics app to handle Newton voter data
 
-from django.db import models
-import csv
-from datetime import datetime
+from django.db import models, transaction, connection
+from django.db.models import Avg, Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+import time
+import uuid
+from collections import Counter
+from .filters import VoterFilter
+from .parsing import (DEFAULT_DATE, ELECTION_FIELDS, VOTER_CSV_FIELDS,
+                      participation_mask, read_voter_csv,
+                      read_voter_csv_parallel)
+from .snapshot import is_snapshot, read_voter_snapshot
+
+# above this many elections the IN list of matching masks gets too long and
+# the bitwise filters fall back to an AND expression
+MAX_MASK_IN_BITS = 8
+
+
+def election_mask(elections):
+    """Build the participation bitmask for some election field names.
+    Returns: integer mask
+    """
+    mask = 0
+    for election in elections:
+        if election not in ELECTION_FIELDS:
+            raise ValueError(f"Unknown election: {election}")
+        mask |= 1 << ELECTION_FIELDS.index(election)
+    return mask
+
+
+class VoterQuerySet(models.QuerySet):
+    """QuerySet with helpers for the voter filter form.
+
+    Also used by VoterRollup, which has the same filter column names.
+    """
+
+    def filter_by_params(self, params):
+        """Filter voters using the filter form's GET parameters.
+        Args: params - QueryDict or dict with party, min_dob, max_dob,
+              voter_score and the election checkbox names
+        Returns: filtered QuerySet
+        """
+        return VoterFilter.from_params(params).apply(self)
+
+    def _filter_mask(self, matches):
+        """Filter on participation_mask values for which matches(mask) is true."""
+        # with few elections, list every matching mask so the lookup is an
+        # indexed IN rather than a function of the column
+        masks = [m for m in range(1 << len(ELECTION_FIELDS)) if matches(m)]
+        return self.filter(participation_mask__in=masks)
+
+    def voted_in_all(self, *elections):
+        """Voters who took part in every one of the given elections.
+        Args: elections - election field names such as 'v20state'
+        Returns: filtered QuerySet
+        """
+        wanted = election_mask(elections)
+        if len(ELECTION_FIELDS) > MAX_MASK_IN_BITS:
+            return (self.alias(_voted=models.F('participation_mask').bitand(wanted))
+                        .filter(_voted=wanted))
+        return self._filter_mask(lambda mask: mask & wanted == wanted)
+
+    def voted_in_any(self, *elections):
+        """Voters who took part in at least one of the given elections.
+        Args: elections - election field names such as 'v20state'
+        Returns: filtered QuerySet
+        """
+        wanted = election_mask(elections)
+        if len(ELECTION_FIELDS) > MAX_MASK_IN_BITS:
+            return (self.alias(_voted=models.F('participation_mask').bitand(wanted))
+                        .exclude(_voted=0))
+        return self._filter_mask(lambda mask: mask & wanted)
+
 
 class Voter(models.Model):
     """Model representing a registered voter in Newton, MA."""
@@ -36,10 +105,47 @@ class Voter(models.Model):
     # voter participation score (0-5)
     voter_score = models.IntegerField()
 
+    # year of date_of_birth, stored so year filters can use an index
+    birth_year = models.IntegerField(default=DEFAULT_DATE.year)
+
+    # the election flags above packed into bits, see ELECTION_FIELDS
+    participation_mask = models.PositiveSmallIntegerField(default=0)
+
+    objects = VoterQuerySet.as_manager()
+
+    class Meta:
+        # shaped to the filter form: equality columns first, birth year last
+        # since it is always a range
+        indexes = [
+            models.Index(fields=['birth_year'], name='voter_year_idx'),
+            models.Index(fields=['party_affiliation', 'birth_year'],
+                         name='voter_party_year_idx'),
+            models.Index(fields=['voter_score', 'birth_year'],
+                         name='voter_score_year_idx'),
+            models.Index(fields=['party_affiliation', 'voter_score', 'birth_year'],
+                         name='voter_party_score_year_idx'),
+            # a precinct's voters in walking order, for canvassing sheets
+            models.Index(fields=['precinct_number', 'street_name', 'street_number',
+                                 'apartment_number'],
+                         name='voter_canvass_idx'),
+            models.Index(fields=['participation_mask', 'birth_year'],
+                         name='voter_mask_year_idx'),
+            # sort order of the voter list, for keyset pagination
+            models.Index(fields=['last_name', 'first_name', 'id'],
+                         name='voter_name_idx'),
+        ]
+
     def __str__(self):
         """String representation of the voter."""
         return f"{self.first_name} {self.last_name} - Precinct {self.precinct_number}"
 
+    def save(self, *args, **kwargs):
+        """Keep the derived birth_year and participation_mask in step before saving."""
+        self.birth_year = self.date_of_birth.year
+        self.participation_mask = participation_mask(
+            {e: getattr(self, e) for e in ELECTION_FIELDS})
+        super().save(*args, **kwargs)
+
     @property
     def full_address(self):
         """Get the full street address for this voter."""
@@ -51,69 +157,471 @@ class Voter(models.Model):
         return address
 
 
-def load_data():
-    """Load voter data from the CSV file into the database."""
-
-    # delete existing records to avoid duplicates
-    Voter.objects.all().delete()
-
-    # path to the csv file
-    filename = 'voter_analytics/newton_voters.csv'
-
-    # list to hold voter objects for bulk create
-    voters_to_create = []
-
-    # open and read the CSV file
-    with open(filename, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-
-        # counter for progress tracking
-        count = 0
-
-        for row in reader:
-            # parse the dates, handle invalid dates
-            try:
-                dob = datetime.strptime(row['Date of Birth'], '%Y-%m-%d').date()
-            except ValueError:
-                # handle invalid dates like 1900-01-00
-                dob = datetime.strptime('1900-01-01', '%Y-%m-%d').date()
-
-            try:
-                reg_date = datetime.strptime(row['Date of Registration'], '%Y-%m-%d').date()
-            except ValueError:
-                # handle invalid dates, use a default date
-                reg_date = datetime.strptime('1900-01-01', '%Y-%m-%d').date()
-
-            # create voter object
-            voter = Voter(
-                last_name=row['Last Name'],
-                first_name=row['First Name'],
-                street_number=row['Residential Address - Street Number'],
-                street_name=row['Residential Address - Street Name'],
-                apartment_number=row['Residential Address - Apartment Number'],
-                zip_code=row['Residential Address - Zip Code'],
-                date_of_birth=dob,
-                date_of_registration=reg_date,
-                party_affiliation=row['Party Affiliation'],
-                precinct_number=row['Precinct Number'],
-                # convert TRUE/FALSE strings to boolean
-                v20state=(row['v20state'] == 'TRUE'),
-                v21town=(row['v21town'] == 'TRUE'),
-                v21primary=(row['v21primary'] == 'TRUE'),
-                v22general=(row['v22general'] == 'TRUE'),
-                v23town=(row['v23town'] == 'TRUE'),
-                voter_score=int(row['voter_score'])
-            )
-
-            # add to list for bulk creation
-            voters_to_create.append(voter)
+# path to the csv file with the Newton voter data
+VOTER_CSV = 'voter_analytics/newton_voters.csv'
+
+# number of voters written per bulk_create call when loading
+LOAD_BATCH_SIZE = 5000
+
+# fields that identify the same voter between two versions of the csv
+NATURAL_KEY_FIELDS = (
+    'last_name', 'first_name', 'date_of_birth',
+    'street_number', 'street_name', 'apartment_number', 'zip_code',
+)
+
+
+class VoterRollup(models.Model):
+    """Voter counts pre-aggregated over the filter form dimensions.
+
+    Every combination of the filter form can be answered by summing count
+    over the matching rows, and the table size depends on the number of
+    distinct combinations rather than the number of voters. Rebuilt by
+    load_data and sync_data, and adjusted bucket by bucket when a single
+    voter is edited.
+    """
+    party_affiliation = models.CharField(max_length=2)
+    birth_year = models.IntegerField()
+    voter_score = models.IntegerField()
+    participation_mask = models.PositiveSmallIntegerField()
+
+    # number of voters with exactly these values
+    count = models.IntegerField()
+
+    objects = VoterQuerySet.as_manager()
+
+    def __str__(self):
+        """String representation of the rollup row."""
+        return (f"{self.party_affiliation} {self.birth_year} score {self.voter_score} "
+                f"mask {self.participation_mask}: {self.count}")
+
+
+# Voter columns the rollup groups by
+ROLLUP_FIELDS = ('party_affiliation', 'birth_year', 'voter_score', 'participation_mask')
+
+# positions in a row of VOTER_CSV_FIELDS values, used by sync_data
+ROLLUP_INDEXES = tuple(VOTER_CSV_FIELDS.index(field) for field in ROLLUP_FIELDS)
+PRECINCT_INDEX = VOTER_CSV_FIELDS.index('precinct_number')
+
+
+def build_rollup():
+    """Rebuild VoterRollup from the Voter table.
+    Returns: number of rollup rows
+    """
+    VoterRollup.objects.all().delete()
+    groups = Voter.objects.order_by().values(*ROLLUP_FIELDS).annotate(count=Count('id'))
+    rows = VoterRollup.objects.bulk_create(
+        (VoterRollup(**group) for group in groups.iterator()),
+        batch_size=LOAD_BATCH_SIZE)
+    return len(rows)
+
+
+def rollup_key(voter):
+    """Get the rollup bucket a voter is counted in.
+    Returns: tuple of the voter's ROLLUP_FIELDS values
+    """
+    return tuple(getattr(voter, field) for field in ROLLUP_FIELDS)
+
+
+def adjust_rollup(deltas):
+    """Add or remove voters from rollup buckets, creating or removing rows as needed.
+
+    Does nothing while the rollup is not built, since the stats code then
+    reads the Voter table and a partial rollup would be wrong.
+    Args: deltas - dict of bucket from rollup_key() to change in the number of voters
+    """
+    if not VoterRollup.objects.exists():
+        return
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        fields = dict(zip(ROLLUP_FIELDS, key))
+        if not VoterRollup.objects.filter(**fields).update(count=F('count') + delta) and delta > 0:
+            VoterRollup.objects.create(count=delta, **fields)
+    VoterRollup.objects.filter(count__lte=0).delete()
+
+
+# Voter columns that identify a household
+HOUSEHOLD_FIELDS = ('precinct_number', 'street_name', 'street_number',
+                    'apartment_number', 'zip_code')
+
+
+class Household(models.Model):
+    """Voters sharing a residential address, precomputed by load_data and sync_data."""
+    precinct_number = models.CharField(max_length=10)
+    street_name = models.CharField(max_length=100)
+    street_number = models.CharField(max_length=20)
+    apartment_number = models.CharField(max_length=20, blank=True)
+    zip_code = models.CharField(max_length=10)
+
+    voter_count = models.IntegerField()
+    avg_voter_score = models.FloatField()
+
+    class Meta:
+        # one row per address, which build_households upserts on so pks stay
+        # stable; its index also serves walking order within a precinct
+        constraints = [
+            models.UniqueConstraint(fields=HOUSEHOLD_FIELDS, name='household_address_unique'),
+        ]
+
+    def __str__(self):
+        """String representation of the household."""
+        return f"{self.address} ({self.voter_count} voters)"
+
+    @property
+    def address(self):
+        """Get the street address of this household."""
+        address = f"{self.street_number} {self.street_name}"
+        if self.apartment_number:
+            address += f" Apt {self.apartment_number}"
+        return address
+
+    def voters(self):
+        """Get everyone registered at this address, using voter_canvass_idx.
+        Returns: Voter QuerySet
+        """
+        return Voter.objects.filter(**{f: getattr(self, f) for f in HOUSEHOLD_FIELDS})
+
+    @classmethod
+    def for_voter(cls, voter):
+        """Get the household a voter belongs to, or None if it is not built yet."""
+        return cls.objects.filter(**{f: getattr(voter, f) for f in HOUSEHOLD_FIELDS}).first()
+
+
+class PrecinctStats(models.Model):
+    """Summary of one precinct, precomputed by load_data and sync_data."""
+    precinct_number = models.CharField(max_length=10, unique=True)
+    voter_count = models.IntegerField()
+    household_count = models.IntegerField()
+    avg_voter_score = models.FloatField()
+
+    # {party_affiliation: voters} and {election field: voters who took part}
+    party_counts = models.JSONField(default=dict)
+    election_counts = models.JSONField(default=dict)
 
+    class Meta:
+        verbose_name_plural = 'precinct stats'
+
+    def __str__(self):
+        """String representation of the precinct summary."""
+        return f"Precinct {self.precinct_number}: {self.voter_count} voters"
+
+
+def build_households(precincts=None):
+    """Bring Household rows in line with the Voter table with one grouped query.
+
+    Rows are upserted on the address, so a household keeps its primary key
+    (and /household/<pk> links keep working) across imports and edits, and
+    only addresses nobody lives at any more are deleted.
+    Args: precincts - only rebuild these precinct numbers, or None for all
+    Returns: number of households written
+    """
+    households = Household.objects.all()
+    voters = Voter.objects.all()
+    if precincts is not None:
+        households = households.filter(precinct_number__in=precincts)
+        voters = voters.filter(precinct_number__in=precincts)
+
+    # one indexed lookup per household on voter_canvass_idx
+    occupied = Voter.objects.filter(**{f: OuterRef(f) for f in HOUSEHOLD_FIELDS})
+    households.exclude(Exists(occupied)).delete()
+
+    groups = (voters.order_by().values(*HOUSEHOLD_FIELDS)
+                    .annotate(voter_count=Count('id'), avg_voter_score=Avg('voter_score')))
+    rows = Household.objects.bulk_create(
+        (Household(**group) for group in groups.iterator()),
+        batch_size=LOAD_BATCH_SIZE, update_conflicts=True,
+        unique_fields=HOUSEHOLD_FIELDS, update_fields=['voter_count', 'avg_voter_score'])
+    return len(rows)
+
+
+def build_precinct_stats(precincts=None):
+    """Rebuild PrecinctStats rows from the Voter and Household tables.
+
+    Call after build_households, since household counts come from it.
+    Args: precincts - only rebuild these precinct numbers, or None for all
+    Returns: number of precincts written
+    """
+    stats = PrecinctStats.objects.all()
+    voters = Voter.objects.order_by()
+    households = Household.objects.order_by()
+    if precincts is not None:
+        stats = stats.filter(precinct_number__in=precincts)
+        voters = voters.filter(precinct_number__in=precincts)
+        households = households.filter(precinct_number__in=precincts)
+
+    # one grouped query for totals and election turnout, one for parties
+    totals = voters.values('precinct_number').annotate(
+        voter_count=Count('id'), avg_voter_score=Avg('voter_score'),
+        **{e: Count('id', filter=Q(**{e: True})) for e in ELECTION_FIELDS})
+    parties = voters.values_list('precinct_number', 'party_affiliation').annotate(Count('id'))
+    household_counts = dict(households.values_list('precinct_number')
+                                      .annotate(Count('id')))
+
+    party_counts = {}
+    for precinct, party, count in parties:
+        party_counts.setdefault(precinct, {})[party] = count
+
+    stats.delete()
+    rows = PrecinctStats.objects.bulk_create(
+        PrecinctStats(
+            precinct_number=row['precinct_number'],
+            voter_count=row['voter_count'],
+            household_count=household_counts.get(row['precinct_number'], 0),
+            avg_voter_score=row['avg_voter_score'],
+            party_counts=party_counts.get(row['precinct_number'], {}),
+            election_counts={e: row[e] for e in ELECTION_FIELDS},
+        )
+        for row in totals)
+    return len(rows)
+
+
+class DataVersion(models.Model):
+    """The latest change to the voter data.
+
+    The table holds a single row, rewritten with a fresh uuid on every
+    change. The uuid versions everything derived from the Voter table, so
+    caches keyed on it are invalidated by the next import.
+    """
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    timestamp = models.DateTimeField(auto_now=True)
+    source = models.CharField(max_length=20)  # 'load', 'sync' or 'edit'
+    rows = models.IntegerField(default=0)
+
+    def __str__(self):
+        """String representation of the data version."""
+        return f"{self.source} of {self.rows} rows at {self.timestamp}"
+
+
+def get_data_version():
+    """Get the current voter data version.
+    Returns: string that changes whenever the voter data changes
+    """
+    version = DataVersion.objects.values_list('uuid', flat=True).first()
+    return version.hex if version else 'empty'
+
+
+def bump_data_version(source, rows=0):
+    """Record a change to the voter data, invalidating cached results.
+
+    This includes every cached voter page: an import reuses primary keys,
+    and one edit can change a neighbour's household.
+    """
+    changes = {'uuid': uuid.uuid4(), 'timestamp': timezone.now(), 'source': source, 'rows': rows}
+    if not DataVersion.objects.update(**changes):
+        DataVersion.objects.create(**changes)
+
+
+def delete_voters(pks=None):
+    """Delete voters with plain DELETE statements.
+
+    QuerySet.delete() would load every Voter to send post_delete signals,
+    which defeats the point of a streaming load.
+    Args: pks - primary keys to delete, or None to delete every voter
+    """
+    table = Voter._meta.db_table
+    with connection.cursor() as cursor:
+        if pks is None:
+            cursor.execute(f'DELETE FROM {table}')
+            return
+        for i in range(0, len(pks), LOAD_BATCH_SIZE):
+            chunk = pks[i:i + LOAD_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', chunk)
+
+
+def analyze_voters():
+    """Refresh the query planner's statistics for the Voter table."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {Voter._meta.db_table}')
+
+
+def finish_import(source, rows):
+    """Rebuild everything derived from the Voter table after an import."""
+    # imported here because search builds on this module
+    from .search import rebuild_search_index
+
+    build_rollup()
+    build_households()
+    build_precinct_stats()
+    rebuild_search_index()
+    analyze_voters()
+    bump_data_version(source, rows)
+
+
+def finish_sync(rows, rollup_deltas, precincts, indexed, unindexed):
+    """Update what is derived from the Voter table after a sync, touching only what changed.
+
+    Planner statistics are left for the next full load, since ANALYZE
+    reads the whole table.
+    Args: rows - number of voters created, updated or deleted
+          rollup_deltas - dict of rollup bucket to change in its count
+          precincts - precinct numbers that voters moved into or out of
+          indexed - pks of created and updated voters
+          unindexed - pks of deleted voters
+    """
+    from .search import index_voters, unindex_voters
+
+    adjust_rollup(rollup_deltas)
+    build_households(precincts)
+    build_precinct_stats(precincts)
+    unindex_voters(unindexed)
+    index_voters(indexed)
+    bump_data_version('sync', rows)
+
+
+def read_voters(filename, workers=1, trust_snapshot=False):
+    """Yield Voter field dicts from the CSV, using worker processes if workers > 1.
+
+    Binary snapshots written by snapshot_voters are read column-wise from a
+    memory map instead, and refused if the CSV they came from has changed
+    or is missing, unless trust_snapshot is set.
+    """
+    if is_snapshot(filename):
+        return read_voter_snapshot(filename, trust=trust_snapshot)
+    if workers > 1:
+        return read_voter_csv_parallel(filename, workers)
+    return read_voter_csv(filename)
+
+
+def load_data(filename=VOTER_CSV, batch_size=LOAD_BATCH_SIZE, verbose=True,
+              workers=1, trust_snapshot=False):
+    """Load voter data from the CSV file into the database.
+
+    Rows are streamed from the file and written in batches of batch_size,
+    so memory use stays flat no matter how large the input is. The whole
+    load runs in one transaction, so readers never see a half-loaded table.
+    With workers > 1 the CSV is parsed by a process pool and this process
+    is the single writer.
+    Returns: number of voters loaded
+    """
+    start = time.monotonic()
+    count = 0
+    batch = []
+
+    with transaction.atomic():
+        # delete existing records to avoid duplicates
+        delete_voters()
+
+        for fields in read_voters(filename, workers, trust_snapshot):
+            batch.append(Voter(**fields))
             count += 1
-            # print progress every 5000 records
-            if count % 5000 == 0:
-                print(f"Processed {count} records...")
 
-    # bulk create all voters at once for efficiency
-    Voter.objects.bulk_create(voters_to_create)
+            # flush a full batch so it can be garbage collected
+            if len(batch) >= batch_size:
+                Voter.objects.bulk_create(batch)
+                batch = []
+                if verbose:
+                    print(f"Processed {count} records...")
+
+        # write whatever is left over
+        if batch:
+            Voter.objects.bulk_create(batch)
+
+        finish_import('load', count)
+
+    elapsed = time.monotonic() - start
+    if verbose:
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"Successfully loaded {count} voter records "
+              f"in {elapsed:.1f}s ({rate:.0f} rows/s).")
+    return count
+
+
+def sync_data(filename=VOTER_CSV, batch_size=LOAD_BATCH_SIZE, verbose=True,
+              workers=1, trust_snapshot=False):
+    """Bring the Voter table in line with the CSV file without reloading it.
+
+    Rows are matched on NATURAL_KEY_FIELDS (name, date of birth, address):
+    new rows are inserted, changed rows are updated in place and rows that
+    are no longer in the file are deleted. Unchanged voters keep their
+    primary key, so /voter/<pk> links stay valid between refreshes. Only
+    the rollup buckets, precincts and search entries of changed voters are
+    updated, and a sync that changes nothing leaves every cache valid.
+    Returns: dict with created/updated/deleted/unchanged counts
+    """
+    start = time.monotonic()
+    summary = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    update_fields = [f for f in VOTER_CSV_FIELDS if f not in NATURAL_KEY_FIELDS]
+    to_create = []
+    to_update = []
+
+    # what the changed voters touch, so only that is brought up to date
+    rollup_deltas = Counter()
+    precincts = set()
+    indexed = []
+
+    def forget(values):
+        """Take an old row, as a tuple in VOTER_CSV_FIELDS order, out of the totals."""
+        rollup_deltas[tuple(values[i] for i in ROLLUP_INDEXES)] -= 1
+        precincts.add(values[PRECINCT_INDEX])
+
+    def count(fields):
+        """Add a new row's fields to the totals."""
+        rollup_deltas[tuple(fields[f] for f in ROLLUP_FIELDS)] += 1
+        precincts.add(fields['precinct_number'])
+
+    with transaction.atomic():
+        # map each natural key to the (pk, values) of the voters that have it;
+        # a list because the file may contain exact duplicates
+        existing = {}
+        rows = Voter.objects.values_list('pk', *VOTER_CSV_FIELDS)
+        for row in rows.iterator(chunk_size=batch_size):
+            fields = dict(zip(VOTER_CSV_FIELDS, row[1:]))
+            key = tuple(fields[f] for f in NATURAL_KEY_FIELDS)
+            existing.setdefault(key, []).append((row[0], row[1:]))
+
+        for fields in read_voters(filename, workers, trust_snapshot):
+            key = tuple(fields[f] for f in NATURAL_KEY_FIELDS)
+            matches = existing.get(key)
+
+            if not matches:
+                to_create.append(Voter(**fields))
+                count(fields)
+            else:
+                pk, old_values = matches.pop()
+                if old_values == tuple(fields[f] for f in VOTER_CSV_FIELDS):
+                    summary['unchanged'] += 1
+                else:
+                    to_update.append(Voter(pk=pk, **fields))
+                    forget(old_values)
+                    count(fields)
+
+            # flush full batches as we go to keep memory bounded
+            if len(to_create) >= batch_size:
+                # SQLite returns the new primary keys from the INSERT
+                indexed += [voter.pk for voter in Voter.objects.bulk_create(to_create)]
+                summary['created'] += len(to_create)
+                to_create = []
+            if len(to_update) >= batch_size:
+                Voter.objects.bulk_update(to_update, update_fields)
+                indexed += [voter.pk for voter in to_update]
+                summary['updated'] += len(to_update)
+                to_update = []
+
+        if to_create:
+            indexed += [voter.pk for voter in Voter.objects.bulk_create(to_create)]
+            summary['created'] += len(to_create)
+        if to_update:
+            Voter.objects.bulk_update(to_update, update_fields)
+            indexed += [voter.pk for voter in to_update]
+            summary['updated'] += len(to_update)
+
+        # anything left in the map has disappeared from the file
+        stale = []
+        for matches in existing.values():
+            for pk, old_values in matches:
+                stale.append(pk)
+                forget(old_values)
+        delete_voters(stale)
+        summary['deleted'] = len(stale)
+
+        changed = summary['created'] + summary['updated'] + summary['deleted']
+        if changed:
+            finish_sync(changed, rollup_deltas, precincts, indexed, stale)
 
-    print(f"Successfully loaded {count} voter records.")
\ No newline at end of file
+    elapsed = time.monotonic() - start
+    if verbose:
+        print(f"Synced voter records in {elapsed:.1f}s: "
+              f"{summary['created']} created, {summary['updated']} updated, "
+              f"{summary['deleted']} deleted, {summary['unchanged']} unchanged.")
+    return summary
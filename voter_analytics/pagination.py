@@ -0,0 +1,191 @@
+# File: pagination.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Keyset (cursor) pagination so every page of a long ordered list
+# costs the same as the first one
+
+import base64
+import binascii
+import json
+import math
+
+from django.db.models import Q
+
+
+def encode_cursor(direction, page, key):
+    """Pack a cursor into an opaque URL-safe token.
+    Args: direction - 'next', 'prev' or 'last'
+          page - number of the page the cursor leads to
+          key - ordering values of the row to seek from (None for 'last')
+    """
+    data = json.dumps([direction, page, key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Unpack a cursor token.
+
+    Tokens come from the query string, so anything a client could forge is
+    rejected here rather than reaching the seek filter.
+    Args: size - number of ordering fields the key must hold
+    Returns: (direction, page, key), or None if the token is missing or invalid
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, page, key = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in ('next', 'prev', 'last') or type(page) is not int:
+        return None
+    if direction == 'last':
+        return direction, page, None
+    # bool is a subclass of int, but never an ordering value
+    if (not isinstance(key, list) or len(key) != size
+            or any(type(value) not in (str, int) for value in key)):
+        return None
+    return direction, page, key
+
+
+def seek(fields, key, lookup):
+    """Q matching rows that sort strictly after (gt) or before (lt) key.
+    Args: fields - ordering field names, all ascending
+          key - ordering values of the row to seek from
+          lookup - 'gt' or 'lt'
+    """
+    condition = Q()
+    for i, field in enumerate(fields):
+        # equal on every earlier field, past the key on this one
+        step = Q(**dict(zip(fields[:i], key[:i])))
+        step &= Q(**{f'{field}__{lookup}': key[i]})
+        condition |= step
+    return condition
+
+
+class KeysetPaginator:
+    """Stand-in for Django's Paginator with a count supplied by the caller."""
+
+    def __init__(self, count, per_page):
+        """Store the (possibly estimated) total and page size."""
+        self.count = count
+        self.per_page = per_page
+        self.num_pages = max(1, math.ceil(count / per_page))
+
+
+class KeysetPage:
+    """One page of rows, with cursors for the neighbouring pages.
+
+    Mirrors the parts of django.core.paginator.Page the templates use.
+    """
+
+    def __init__(self, object_list, number, paginator, has_previous, has_next, fields):
+        """Store the page rows and work out the neighbouring cursors."""
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.fields = fields
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def _key(self, obj):
+        """Ordering values of one row."""
+        return [getattr(obj, field) for field in self.fields]
+
+    @property
+    def previous_cursor(self):
+        """Cursor for the page before this one."""
+        if not self._has_previous:
+            return ''
+        return encode_cursor('prev', self.number - 1, self._key(self.object_list[0]))
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page after this one."""
+        if not self._has_next:
+            return ''
+        return encode_cursor('next', self.number + 1, self._key(self.object_list[-1]))
+
+    @property
+    def last_cursor(self):
+        """Cursor for the final page."""
+        return encode_cursor('last', self.paginator.num_pages, None)
+
+
+def keyset_paginate(queryset, fields, per_page, cursor, count):
+    """Fetch one page of queryset by seeking on fields rather than using OFFSET.
+
+    There should be an index on fields, the last of which must be unique
+    (such as id). Each page is one indexed range query no matter how deep it is.
+    Args: queryset - unordered QuerySet to page through
+          fields - ordering field names, all ascending
+          per_page - rows per page
+          cursor - token from a KeysetPage, or None for the first page
+          count - total number of rows, used for the page count and last page
+    Returns: KeysetPage
+    """
+    paginator = KeysetPaginator(count, per_page)
+    forward = queryset.order_by(*fields)
+    backward = queryset.order_by(*[f'-{field}' for field in fields])
+    decoded = decode_cursor(cursor, len(fields))
+
+    if decoded is None:
+        # first page
+        rows = list(forward[:per_page + 1])
+        return KeysetPage(rows[:per_page], 1, paginator, False,
+                          len(rows) > per_page, fields)
+
+    direction, number, key = decoded
+    if direction == 'last':
+        # read the tail of the list backwards
+        size = count - (paginator.num_pages - 1) * per_page
+        rows = list(backward[:max(size, 1)])[::-1]
+        return KeysetPage(rows, paginator.num_pages, paginator,
+                          paginator.num_pages > 1, False, fields)
+
+    try:
+        forward.filter(seek(fields, key, 'gt'))
+    except ValueError:
+        # a value of the wrong type for its field, e.g. text for the id
+        return keyset_paginate(queryset, fields, per_page, None, count)
+
+    # also bound the first field so the database can seek on the index
+    if direction == 'next':
+        rows = list(forward.filter(**{f'{fields[0]}__gte': key[0]})
+                           .filter(seek(fields, key, 'gt'))[:per_page + 1])
+    else:
+        rows = list(backward.filter(**{f'{fields[0]}__lte': key[0]})
+                            .filter(seek(fields, key, 'lt'))[:per_page + 1])
+    if not rows:
+        # a key past either end of the list, forged or left by deleted voters
+        return keyset_paginate(queryset, fields, per_page, None, count)
+
+    if direction == 'next':
+        return KeysetPage(rows[:per_page], number, paginator, True,
+                          len(rows) > per_page, fields)
+
+    has_previous = len(rows) > per_page
+    # an estimated count can make page numbers drift; the start is always 1
+    return KeysetPage(rows[:per_page][::-1], number if has_previous else 1,
+                      paginator, has_previous, True, fields)
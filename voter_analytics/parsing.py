@@ -0,0 +1,149 @@
+# File: parsing.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: CSV parsing for the Newton voter file, serial and multi-process.
+# This module does not import Django so it can run inside worker processes.
+
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+# fallback for invalid dates in the csv like 1900-01-00
+DEFAULT_DATE = date(1900, 1, 1)
+
+# boolean fields recording whether a voter took part in each election;
+# election i is bit (1 << i) of Voter.participation_mask, so only append
+ELECTION_FIELDS = ('v20state', 'v21town', 'v21primary', 'v22general', 'v23town')
+
+# Voter fields filled in from each csv row, in the order parse_voter_row uses
+VOTER_CSV_FIELDS = (
+    'last_name', 'first_name', 'street_number', 'street_name',
+    'apartment_number', 'zip_code', 'date_of_birth', 'date_of_registration',
+    'party_affiliation', 'precinct_number', 'v20state', 'v21town',
+    'v21primary', 'v22general', 'v23town', 'voter_score', 'birth_year',
+    'participation_mask',
+)
+
+# size of each byte range handed to a worker process
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD date string, falling back to DEFAULT_DATE."""
+    try:
+        # much cheaper than datetime.strptime for ISO dates
+        return date.fromisoformat(value)
+    except ValueError:
+        # handle invalid dates like 1900-01-00
+        return DEFAULT_DATE
+
+
+def participation_mask(voted):
+    """Pack election flags into a bitmask.
+    Args: voted - mapping of election field name to boolean
+    Returns: integer with bit i set if the voter took part in ELECTION_FIELDS[i]
+    """
+    mask = 0
+    for bit, election in enumerate(ELECTION_FIELDS):
+        if voted[election]:
+            mask |= 1 << bit
+    return mask
+
+
+def parse_voter_row(row):
+    """Convert one csv.DictReader row into a dict of Voter field values."""
+    dob = parse_date(row['Date of Birth'])
+    fields = dict(
+        last_name=row['Last Name'],
+        first_name=row['First Name'],
+        street_number=row['Residential Address - Street Number'],
+        street_name=row['Residential Address - Street Name'],
+        apartment_number=row['Residential Address - Apartment Number'],
+        zip_code=row['Residential Address - Zip Code'],
+        date_of_birth=dob,
+        date_of_registration=parse_date(row['Date of Registration']),
+        party_affiliation=row['Party Affiliation'],
+        precinct_number=row['Precinct Number'],
+        # convert TRUE/FALSE strings to boolean
+        v20state=(row['v20state'] == 'TRUE'),
+        v21town=(row['v21town'] == 'TRUE'),
+        v21primary=(row['v21primary'] == 'TRUE'),
+        v22general=(row['v22general'] == 'TRUE'),
+        v23town=(row['v23town'] == 'TRUE'),
+        voter_score=int(row['voter_score']),
+        birth_year=dob.year,
+    )
+    fields['participation_mask'] = participation_mask(fields)
+    return fields
+
+
+def read_voter_csv(filename):
+    """Yield Voter field dicts from the CSV file one row at a time."""
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        for row in csv.DictReader(file):
+            yield parse_voter_row(row)
+
+
+def split_csv(filename, chunk_bytes=CHUNK_BYTES):
+    """Split the CSV body into byte ranges that start and end on row boundaries.
+
+    Assumes no quoted field contains a newline, which holds for the
+    Newton voter file.
+    Returns: (list of column names, list of (start, end) byte offsets)
+    """
+    with open(filename, 'rb') as file:
+        header = file.readline().decode('utf-8-sig')
+        fieldnames = next(csv.reader([header]))
+        size = os.fstat(file.fileno()).st_size
+
+        ranges = []
+        start = file.tell()
+        while start < size:
+            # jump ahead, then finish the row we landed in
+            file.seek(min(start + chunk_bytes, size))
+            file.readline()
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+
+    return fieldnames, ranges
+
+
+def parse_chunk(filename, start, end, fieldnames):
+    """Parse the rows in one byte range of the CSV file.
+
+    Runs in a worker process, so it returns plain tuples in
+    VOTER_CSV_FIELDS order, which are much cheaper to pickle than dicts.
+    """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+
+    reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+    return [tuple(parse_voter_row(row).values()) for row in reader]
+
+
+def read_voter_csv_parallel(filename, workers, chunk_bytes=CHUNK_BYTES):
+    """Yield Voter field dicts parsed by a pool of worker processes.
+
+    Chunks are yielded in file order. Only a few chunks are in flight at a
+    time, so memory stays bounded even if the caller writes slowly.
+    """
+    fieldnames, ranges = split_csv(filename, chunk_bytes)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(parse_chunk, filename, start, end, fieldnames))
+
+            # wait for the oldest chunk once enough work is queued
+            if len(pending) >= workers * 2:
+                for values in pending.popleft().result():
+                    yield dict(zip(VOTER_CSV_FIELDS, values))
+
+        while pending:
+            for values in pending.popleft().result():
+                yield dict(zip(VOTER_CSV_FIELDS, values))
@@ -0,0 +1,164 @@
+# File: search.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Ranked name and street search over voters, backed by an SQLite
+# FTS5 index that imports rebuild and single-voter edits keep current
+
+import re
+
+from django.db import connection
+from .models import Voter
+
+SEARCH_TABLE = 'voter_analytics_voter_fts'
+SEARCH_FIELDS = ('last_name', 'first_name', 'street_name')
+
+# bm25 weights per column; surname matches rank above first names and streets
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+# ids per statement when indexing many voters, under SQLite's parameter limit
+SEARCH_BATCH_SIZE = 500
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query where every word must match as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    treated as plain text.
+    Returns: MATCH string, or '' if the query has no words
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def rebuild_search_index():
+    """Refill the search index from the Voter table with set-based SQL."""
+    fields = ', '.join(SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {fields}) '
+            f'SELECT id, {fields} FROM {Voter._meta.db_table}'
+        )
+        # merge the index into as few b-trees as possible for faster lookups
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def index_voters(pks):
+    """Add or replace the search entries of many voters, reading them from the Voter table."""
+    fields = ', '.join(SEARCH_FIELDS)
+    unindex_voters(pks)
+    with connection.cursor() as cursor:
+        for chunk in _chunks(pks):
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {fields}) '
+                f'SELECT id, {fields} FROM {Voter._meta.db_table} '
+                f'WHERE id IN ({", ".join(["%s"] * len(chunk))})',
+                chunk,
+            )
+
+
+def unindex_voters(pks):
+    """Remove the search entries of many voters."""
+    with connection.cursor() as cursor:
+        for chunk in _chunks(pks):
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} '
+                           f'WHERE rowid IN ({", ".join(["%s"] * len(chunk))})', chunk)
+
+
+def _chunks(pks):
+    """Split pks into lists short enough for one statement's parameters."""
+    pks = list(pks)
+    return [pks[i:i + SEARCH_BATCH_SIZE] for i in range(0, len(pks), SEARCH_BATCH_SIZE)]
+
+
+def index_voter(voter):
+    """Add or replace one voter's search entry."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [voter.pk])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) VALUES (%s, %s, %s, %s)',
+            [voter.pk] + [getattr(voter, field) for field in SEARCH_FIELDS],
+        )
+
+
+def unindex_voter(pk):
+    """Remove one voter's search entry."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [pk])
+
+
+class VoterSearchResults:
+    """Lazy, ranked search results that Django's Paginator can slice.
+
+    Only the requested page of ids is read from the index, ordered by
+    bm25 rank, and then only those voters are loaded.
+    """
+
+    def __init__(self, query, voters=None):
+        """Args: query - text typed into the search box
+                 voters - optional filtered Voter QuerySet to search within
+        """
+        self.match = match_expression(query)
+        self.voters = voters
+        self._count = None
+
+    def _where(self):
+        """Build the WHERE clause and its parameters."""
+        sql = f'{SEARCH_TABLE} MATCH %s'
+        params = [self.match]
+        if self.voters is not None:
+            subquery, subparams = self.voters.order_by().values('id').query.sql_with_params()
+            sql += f' AND rowid IN ({subquery})'
+            params.extend(subparams)
+        return sql, params
+
+    def count(self):
+        """Number of matching voters."""
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            else:
+                where, params = self._where()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}', params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        """Number of matching voters."""
+        return self.count()
+
+    def __getitem__(self, index):
+        """Load a page of voters in rank order.
+        Args: index - slice, as passed by Paginator
+        Returns: list of Voter
+        """
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        ids = self.ranked_ids(start, limit)
+
+        voters = Voter.objects.in_bulk(ids)
+        return [voters[pk] for pk in ids if pk in voters]
+
+    def ranked_ids(self, start=0, limit=-1):
+        """Read matching voter ids from the index in rank order.
+        Args: start - number of ids to skip
+              limit - most ids to return, or -1 for all of them
+        Returns: list of int
+        """
+        if not self.match:
+            return []
+        where, params = self._where()
+        weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {where} '
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s OFFSET %s',
+                params + [limit, start],
+            )
+            return [row[0] for row in cursor.fetchall()]
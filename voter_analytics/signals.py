@@ -0,0 +1,70 @@
+# File: signals.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Signal handlers keeping voter_analytics derived tables honest
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import (ROLLUP_FIELDS, Voter, adjust_rollup, build_households,
+                     build_precinct_stats, bump_data_version, rollup_key)
+from .search import index_voter, unindex_voter
+
+
+@receiver(post_save, sender=Voter)
+def count_saved_voter(sender, instance, **kwargs):
+    """Move a saved voter between rollup buckets and expire cached results.
+
+    Only the one or two buckets involved change, so graphs keep reading
+    the rollup after an edit. Bumping the data version expires every
+    cached result.
+    """
+    old_key = getattr(instance, '_old_rollup_key', None)
+    new_key = rollup_key(instance)
+    if old_key != new_key:
+        deltas = {new_key: 1}
+        if old_key is not None:
+            deltas[old_key] = -1
+        adjust_rollup(deltas)
+    bump_data_version('edit', 1)
+
+
+@receiver(post_delete, sender=Voter)
+def uncount_deleted_voter(sender, instance, **kwargs):
+    """Take a deleted voter out of its rollup bucket and expire cached results."""
+    adjust_rollup({rollup_key(instance): -1})
+    bump_data_version('edit', 1)
+
+
+@receiver(post_save, sender=Voter)
+def voter_saved(sender, instance, **kwargs):
+    """Keep the saved voter's search entry current."""
+    index_voter(instance)
+
+
+@receiver(post_delete, sender=Voter)
+def voter_deleted(sender, instance, **kwargs):
+    """Remove the deleted voter from the search index."""
+    unindex_voter(instance.pk)
+
+
+@receiver(pre_save, sender=Voter)
+def remember_old_values(sender, instance, **kwargs):
+    """Note the precinct and rollup bucket a saved voter is moving out of."""
+    old = (Voter.objects.filter(pk=instance.pk)
+                        .values_list('precinct_number', *ROLLUP_FIELDS).first()
+           if instance.pk else None)
+    instance._old_precinct = old[0] if old else None
+    instance._old_rollup_key = tuple(old[1:]) if old else None
+
+
+@receiver(post_save, sender=Voter)
+@receiver(post_delete, sender=Voter)
+def refresh_precinct(sender, instance, **kwargs):
+    """Rebuild the households and summary of the edited voter's precinct.
+
+    Only one precinct (two if the voter moved) is regrouped, which is a
+    few indexed lookups rather than a pass over every voter.
+    """
+    precincts = {instance.precinct_number, getattr(instance, '_old_precinct', None)} - {None}
+    build_households(precincts)
+    build_precinct_stats(precincts)
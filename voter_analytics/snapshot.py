@@ -0,0 +1,263 @@
+# File: snapshot.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Compact binary snapshot of the parsed voter file, so rebuilds can
+# skip CSV and date parsing. Like parsing.py, this module does not import Django.
+#
+# File layout, with every block starting on an 8-byte boundary:
+#   MAGIC, header length (uint64), JSON header
+#   one fixed-width block per column in SNAPSHOT_COLUMNS
+#   the string dictionary: uint32 end offsets, then the UTF-8 bytes
+# String columns hold uint32 codes into the dictionary, dates hold
+# proleptic ordinals, and the election booleans come from participation_mask.
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date
+from functools import lru_cache
+
+from .parsing import ELECTION_FIELDS, VOTER_CSV_FIELDS, read_voter_csv
+
+MAGIC = b'VOTRSNP1'
+SNAPSHOT_VERSION = 2
+
+# column name -> array typecode
+SNAPSHOT_COLUMNS = {
+    'last_name': 'I',
+    'first_name': 'I',
+    'street_number': 'I',
+    'street_name': 'I',
+    'apartment_number': 'I',
+    'zip_code': 'I',
+    'date_of_birth': 'i',
+    'date_of_registration': 'i',
+    'party_affiliation': 'I',
+    'precinct_number': 'I',
+    'voter_score': 'h',
+    'birth_year': 'h',
+    # uint16 like the model's PositiveSmallIntegerField, so up to 15 elections fit
+    'participation_mask': 'H',
+}
+STRING_COLUMNS = tuple(name for name, code in SNAPSHOT_COLUMNS.items() if code == 'I')
+DATE_COLUMNS = ('date_of_birth', 'date_of_registration')
+
+
+class SnapshotError(Exception):
+    """Raised for a snapshot that is corrupt, incompatible, or older than or missing its CSV."""
+
+
+def _pad(length):
+    """Bytes needed to round length up to a multiple of 8."""
+    return -length % 8
+
+
+def file_fingerprint(filename):
+    """Identify a source file's contents.
+    Returns: dict with path, size, mtime and sha256
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    stat = os.stat(filename)
+    return {'path': filename, 'size': stat.st_size, 'mtime': stat.st_mtime,
+            'sha256': digest.hexdigest()}
+
+
+def write_snapshot(csv_filename, snapshot_filename):
+    """Parse the voter CSV once and write it as a snapshot.
+    Returns: number of voters written
+    """
+    columns = {name: array(code) for name, code in SNAPSHOT_COLUMNS.items()}
+    codes = {}
+    for fields in read_voter_csv(csv_filename):
+        for name in STRING_COLUMNS:
+            columns[name].append(codes.setdefault(fields[name], len(codes)))
+        for name in DATE_COLUMNS:
+            columns[name].append(fields[name].toordinal())
+        for name in ('voter_score', 'birth_year', 'participation_mask'):
+            columns[name].append(fields[name])
+
+    # dictionary entries are in code order, so code i ends at offsets[i]
+    blob = bytearray()
+    offsets = array('I')
+    for value in codes:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+
+    blocks = [(name, columns[name].tobytes()) for name in SNAPSHOT_COLUMNS]
+    blocks += [('dictionary_offsets', offsets.tobytes()), ('dictionary', bytes(blob))]
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': len(columns['birth_year']),
+        'strings': len(codes),
+        'source': file_fingerprint(csv_filename),
+        'blocks': {},
+    }
+    position = 0
+    for name, data in blocks:
+        header['blocks'][name] = {'offset': position, 'length': len(data),
+                                  'crc32': zlib.crc32(data)}
+        position += len(data) + _pad(len(data))
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * _pad(len(MAGIC) + 8 + len(header_bytes))
+
+    # write next to the target and rename, so readers never see half a file
+    temp_filename = snapshot_filename + '.tmp'
+    with open(temp_filename, 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+        for name, data in blocks:
+            file.write(data + b'\0' * _pad(len(data)))
+    os.replace(temp_filename, snapshot_filename)
+
+    return header['rows']
+
+
+def is_snapshot(filename):
+    """Whether the file starts with the snapshot magic bytes."""
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class VoterSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Columns are typed memoryviews straight over the mapping, so opening a
+    snapshot reads nothing but the header and the pages it checksums.
+    """
+
+    def __init__(self, filename, source=None, verify=True, trust=False):
+        """Open and validate a snapshot.
+        Args: filename - snapshot path
+              source - CSV to compare against, by default the one the
+                       snapshot was built from; if its contents differ from
+                       when the snapshot was written, the snapshot is stale,
+                       and if it is missing, the snapshot is unverifiable
+              verify - check every block's CRC32
+              trust - skip the comparison with the CSV, to restore a
+                      snapshot on its own
+        """
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._read_header()
+            if verify:
+                self.verify()
+            if not trust:
+                self.check_source(source or self.header['source']['path'])
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        """Parse the header and find where the blocks start."""
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise SnapshotError('not a voter snapshot')
+        (length,) = struct.unpack_from('<Q', self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._map[start:start + length])
+
+        if self.header['version'] != SNAPSHOT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {self.header['version']}")
+        if self.header['byteorder'] != sys.byteorder:
+            raise SnapshotError('snapshot was written on a machine with a different byte order')
+        self._data_start = start + length
+        self.rows = self.header['rows']
+
+    def _block(self, name):
+        """Raw bytes of one block, as a memoryview over the mapping."""
+        block = self.header['blocks'][name]
+        start = self._data_start + block['offset']
+        view = memoryview(self._map)[start:start + block['length']]
+        self._views.append(view)
+        return view
+
+    def verify(self):
+        """Raise SnapshotError if any block does not match its checksum."""
+        for name, block in self.header['blocks'].items():
+            if zlib.crc32(self._block(name)) != block['crc32']:
+                raise SnapshotError(f'checksum mismatch in block {name}')
+
+    def check_source(self, source):
+        """Raise SnapshotError if the CSV is missing or has changed since the snapshot was written."""
+        recorded = self.header['source']
+        if not os.path.exists(source):
+            raise SnapshotError(f'snapshot is unverifiable: {source} does not exist')
+        stat = os.stat(source)
+
+        # only hash the CSV when its size or timestamp says it may have changed
+        if (stat.st_size, stat.st_mtime) == (recorded['size'], recorded['mtime']):
+            return
+        if file_fingerprint(source)['sha256'] != recorded['sha256']:
+            raise SnapshotError(f'snapshot is stale: {source} has changed since it was written')
+
+    def column(self, name):
+        """Typed memoryview of one column, without copying it."""
+        view = self._block(name).cast(SNAPSHOT_COLUMNS[name])
+        self._views.append(view)
+        return view
+
+    def strings(self):
+        """Decode the string dictionary.
+        Returns: list of str indexed by code
+        """
+        offsets = self._block('dictionary_offsets').cast('I')
+        self._views.append(offsets)
+        blob = self._block('dictionary')
+        values = []
+        start = 0
+        for end in offsets:
+            values.append(str(blob[start:end], 'utf-8'))
+            start = end
+        return values
+
+    def __iter__(self):
+        """Yield Voter field dicts in file order, like parsing.read_voter_csv."""
+        # decode each column with map() so the per-row work is one dict()
+        to_string = self.strings().__getitem__
+        to_date = lru_cache(maxsize=None)(date.fromordinal)
+        columns = {}
+        for name in SNAPSHOT_COLUMNS:
+            if name in STRING_COLUMNS:
+                columns[name] = map(to_string, self.column(name))
+            elif name in DATE_COLUMNS:
+                columns[name] = map(to_date, self.column(name))
+            else:
+                columns[name] = iter(self.column(name))
+        for bit, election in enumerate(ELECTION_FIELDS):
+            columns[election] = map(bool, map((1 << bit).__and__, self.column('participation_mask')))
+
+        for values in zip(*(columns[name] for name in VOTER_CSV_FIELDS)):
+            yield dict(zip(VOTER_CSV_FIELDS, values))
+
+    def close(self):
+        """Release the column views and unmap the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        """Use the snapshot as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the snapshot on leaving the with block."""
+        self.close()
+
+
+def read_voter_snapshot(filename, source=None, trust=False):
+    """Yield Voter field dicts from a snapshot file, closing it when done."""
+    with VoterSnapshot(filename, source=source, trust=trust) as snapshot:
+        yield from snapshot
@@ -0,0 +1,223 @@
+# File: stats.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Database aggregations behind the voter_analytics graphs
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.lookups import Exact
+from .filters import result_cache
+from .models import (ELECTION_FIELDS, Voter, VoterRollup, election_mask,
+                     get_data_version)
+
+# chart labels for each election field
+ELECTION_LABELS = {
+    'v20state': '2020 State',
+    'v21town': '2021 Town',
+    'v21primary': '2021 Primary',
+    'v22general': '2022 General',
+    'v23town': '2023 Town',
+}
+
+def voted_in(election):
+    """Boolean expression that is true for rows that voted in one election."""
+    bit = election_mask([election])
+    return Exact(F('participation_mask').bitand(bit), bit)
+
+
+def voter_total(rollup, filter=None):
+    """Aggregate that counts voters in a group of Voter or VoterRollup rows."""
+    if rollup:
+        return Sum('count', filter=filter)
+    return Count('id', filter=filter)
+
+
+def birth_year_counts(voters, rollup=False):
+    """Count voters per birth year with one grouped query.
+    Args: voters - filtered Voter QuerySet, or VoterRollup if rollup is True
+    Returns: list of (year, count) sorted by year
+    """
+    rows = (voters.order_by().values_list('birth_year')
+                  .annotate(total=voter_total(rollup)).order_by('birth_year'))
+    return list(rows)
+
+
+def party_and_election_counts(voters, rollup=False):
+    """Count voters per party and per election with one grouped query.
+
+    Each party row also carries its conditional election counts, which are
+    summed here, so no separate COUNT query per election is needed.
+    Args: voters - filtered Voter QuerySet, or VoterRollup if rollup is True
+    Returns: (list of (party, count), list of (election label, count))
+    """
+    rows = (voters.order_by().values('party_affiliation')
+                  .annotate(total=voter_total(rollup),
+                            **{e: voter_total(rollup, filter=voted_in(e))
+                               for e in ELECTION_FIELDS})
+                  .order_by('party_affiliation'))
+
+    parties = []
+    elections = dict.fromkeys(ELECTION_FIELDS, 0)
+    for row in rows:
+        parties.append((row['party_affiliation'], row['total']))
+        for election in ELECTION_FIELDS:
+            # conditional sums are NULL when no row in the group matched
+            elections[election] += row[election] or 0
+
+    return parties, [(ELECTION_LABELS[e], elections[e]) for e in ELECTION_FIELDS]
+
+
+def graph_data(voters, rollup=False):
+    """Compute everything the graphs page plots in two queries.
+    Args: voters - filtered Voter QuerySet, or VoterRollup if rollup is True
+    Returns: dict with birth_years, parties and elections lists of (label, count)
+    """
+    parties, elections = party_and_election_counts(voters, rollup)
+    return {
+        'birth_years': birth_year_counts(voters, rollup),
+        'parties': parties,
+        'elections': elections,
+    }
+
+
+def can_query_concurrently():
+    """Check whether queries may run on other threads' connections.
+
+    Inside a transaction they would not see its uncommitted rows, so they
+    must run on this connection, one after another.
+    """
+    return not connection.in_atomic_block
+
+
+def on_own_connection(func, *args):
+    """Call func in a worker thread and close that thread's connection afterwards."""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+async def graph_data_async(voters, rollup=False):
+    """Like graph_data, but runs its two grouped queries at the same time.
+
+    Each query runs in its own thread on its own connection, so the
+    latency is that of the slower query rather than the sum of both.
+    Returns: dict like graph_data
+    """
+    if not await sync_to_async(can_query_concurrently)():
+        return await sync_to_async(graph_data)(voters, rollup)
+
+    in_thread = sync_to_async(on_own_connection, thread_sensitive=False)
+    (parties, elections), birth_years = await asyncio.gather(
+        in_thread(party_and_election_counts, voters, rollup),
+        in_thread(birth_year_counts, voters, rollup),
+    )
+    return {'birth_years': birth_years, 'parties': parties, 'elections': elections}
+
+
+def rollup_can_answer(voter_filter):
+    """Check whether VoterRollup can answer a filter.
+
+    Every VoterFilter field has a rollup column; a future filter on a column
+    the rollup does not group by must return False here.
+    Returns: True if the rollup is built
+    """
+    return VoterRollup.objects.exists()
+
+
+def columnar_engine():
+    """Get the NumPy engine if settings.VOTER_ANALYTICS_ENGINE is 'columnar'.
+    Returns: ColumnarVoters, or None to use the database
+    """
+    if getattr(settings, 'VOTER_ANALYTICS_ENGINE', 'orm') != 'columnar':
+        return None
+    from .columnar import get_columnar_voters
+    return get_columnar_voters()
+
+
+def filtered_graph_data(voter_filter):
+    """Graph data for a VoterFilter, cached in memory per data version.
+
+    Uses the columnar engine if it is enabled. Otherwise reads from
+    VoterRollup whenever it can, so the cost does not grow with the number
+    of voters, and falls back to the Voter table.
+    """
+    def compute():
+        engine = columnar_engine()
+        if engine is not None:
+            return engine.graph_data(voter_filter)
+        if rollup_can_answer(voter_filter):
+            return graph_data(voter_filter.apply(VoterRollup.objects.all()), rollup=True)
+        return graph_data(voter_filter.apply(Voter.objects.all()))
+
+    return result_cache.get_or_compute('graph_data', voter_filter,
+                                       get_data_version(), compute)
+
+
+async def filtered_graph_data_async(voter_filter):
+    """Async version of filtered_graph_data, sharing its cache entries."""
+    async def compute():
+        engine = await sync_to_async(columnar_engine)()
+        if engine is not None:
+            return await sync_to_async(engine.graph_data)(voter_filter)
+        if await sync_to_async(rollup_can_answer)(voter_filter):
+            return await graph_data_async(voter_filter.apply(VoterRollup.objects.all()), rollup=True)
+        return await graph_data_async(voter_filter.apply(Voter.objects.all()))
+
+    version = await sync_to_async(get_data_version)()
+    return await result_cache.aget_or_compute('graph_data', voter_filter, version, compute)
+
+
+def compute_filter_form_metadata():
+    """Compute the filter form dropdown values from the database.
+    Returns: dict with parties, min_year and max_year
+    """
+    # the rollup has the same columns and is much smaller than Voter
+    source = VoterRollup.objects if VoterRollup.objects.exists() else Voter.objects
+    parties = list(source.order_by('party_affiliation')
+                         .values_list('party_affiliation', flat=True).distinct())
+    bounds = source.aggregate(min_year=Min('birth_year'), max_year=Max('birth_year'))
+
+    # fall back to the old defaults when no voters are loaded
+    return {
+        'parties': parties,
+        'min_year': bounds['min_year'] if bounds['min_year'] is not None else 1900,
+        'max_year': bounds['max_year'] if bounds['max_year'] is not None else 2023,
+    }
+
+
+def filter_form_metadata():
+    """Filter form dropdown values, cached until the voter data changes.
+    Returns: dict from compute_filter_form_metadata
+    """
+    key = f'voter_analytics:metadata:{get_data_version()}'
+    metadata = cache.get(key)
+    if metadata is None:
+        metadata = compute_filter_form_metadata()
+        # the key changes with the data version, so no expiry is needed
+        cache.set(key, metadata, None)
+    return metadata
+
+
+def filtered_voter_count(voter_filter):
+    """Number of voters matching a VoterFilter, cached in memory per data version.
+
+    Read from the columnar engine or the rollup when possible, so even a
+    cache miss does not need a COUNT over the Voter table.
+    """
+    def compute():
+        engine = columnar_engine()
+        if engine is not None:
+            return engine.count(voter_filter)
+        if rollup_can_answer(voter_filter):
+            rows = voter_filter.apply(VoterRollup.objects.all())
+            return rows.aggregate(total=Sum('count'))['total'] or 0
+        return voter_filter.apply(Voter.objects.all()).count()
+
+    return result_cache.get_or_compute('count', voter_filter,
+                                       get_data_version(), compute)
@@ -0,0 +1,139 @@
+# File: synthetic.py
+# Author: Jack Lee (jacklee@bu.edu)
+# Date: October 2025
+# Description: Generator for synthetic voter files shaped like the Newton CSV,
+# for benchmarking at sizes beyond the real file. Like parsing.py, this module
+# does not import Django.
+
+import csv
+import random
+import string
+from datetime import date, timedelta
+
+# column order of the Newton voter file
+CSV_COLUMNS = [
+    'Voter ID Number', 'Last Name', 'First Name',
+    'Residential Address - Street Number', 'Residential Address - Street Name',
+    'Residential Address - Apartment Number', 'Residential Address - Zip Code',
+    'Date of Birth', 'Date of Registration', 'Party Affiliation',
+    'Precinct Number', 'v20state', 'v21town', 'v21primary', 'v22general',
+    'v23town', 'voter_score',
+]
+
+# party codes are two characters wide, padded with a space
+PARTIES = ['D ', 'U ', 'R ', 'J ', 'L ', 'Q ', 'CC', 'GR']
+PARTY_WEIGHTS = [42, 44, 10, 1, 1, 1, 0.5, 0.5]
+
+# every Newton zip code, and the street names of the busiest ones
+ZIP_CODES = ['02458', '02459', '02460', '02461', '02462', '02464',
+             '02465', '02466', '02467', '02468']
+STREETS = [
+    'BEACON ST', 'COMMONWEALTH AVE', 'WASHINGTON ST', 'WALNUT ST', 'CENTRE ST',
+    'HAMMOND ST', 'BOYLSTON ST', 'CHESTNUT ST', 'HIGHLAND ST', 'LOWELL AVE',
+    'WOODWARD ST', 'DEDHAM ST', 'PARKER ST', 'CHERRY ST', 'ADAMS ST',
+    'CALIFORNIA ST', 'AUBURNDALE AVE', 'LEXINGTON ST', 'GROVE ST', 'HOMER ST',
+    'ELIOT ST', 'WARD ST', 'CHESTNUT HILL RD', 'LAKE AVE', 'WALTHAM ST',
+]
+LAST_NAMES = [
+    'SMITH', 'COHEN', 'NGUYEN', 'MURPHY', 'SULLIVAN', 'KIM', 'LEE', 'CHEN',
+    'OBRIEN', 'WANG', 'GOLDBERG', 'SHAPIRO', 'KELLY', 'PATEL', 'ROSSI',
+    'BROWN', 'JOHNSON', 'WILLIAMS', 'GARCIA', 'LEVINE', 'WONG', 'MCCARTHY',
+    'FITZGERALD', 'KAPLAN', 'RYAN', 'SILVA', 'ZHANG', 'FRIEDMAN', 'DOYLE',
+]
+FIRST_NAMES = [
+    'JAMES', 'MARY', 'JOHN', 'PATRICIA', 'ROBERT', 'JENNIFER', 'MICHAEL',
+    'LINDA', 'DAVID', 'ELIZABETH', 'DANIEL', 'SARAH', 'WEI', 'MIN', 'ANNA',
+    'SOFIA', 'NOAH', 'EMMA', 'LIAM', 'OLIVIA', 'ETHAN', 'MAYA', 'BENJAMIN',
+    'RACHEL', 'SAMUEL', 'LEAH', 'JOSEPH', 'GRACE', 'ARJUN', 'PRIYA',
+]
+
+# Newton has 8 wards of 4 precincts
+PRECINCTS = [f'{ward}{precinct}' for ward in range(1, 9) for precinct in range(1, 5)]
+
+# the real file has invalid dates like this one that the loader must handle
+MALFORMED_DATE = '1900-01-00'
+MALFORMED_RATE = 0.01
+
+# election columns, with the base turnout of each
+TURNOUT = {'v20state': 0.85, 'v21town': 0.35, 'v21primary': 0.2,
+           'v22general': 0.7, 'v23town': 0.3}
+
+LAST_ELECTION = date(2023, 11, 7)
+
+
+def synthetic_households(rng):
+    """Yield (street number, street, apartment, zip, precinct, surname, size) forever."""
+    while True:
+        street = rng.choice(STREETS)
+        # a street mostly sits in one zip code and precinct
+        place = STREETS.index(street)
+        zip_code = ZIP_CODES[(place + rng.randrange(2)) % len(ZIP_CODES)]
+        precinct = PRECINCTS[(place * 3 + rng.randrange(3)) % len(PRECINCTS)]
+        apartment = str(rng.randint(1, 40)) if rng.random() < 0.2 else ''
+        size = rng.choices([1, 2, 3, 4, 5], [30, 40, 15, 10, 5])[0]
+        yield (str(rng.randint(1, 1200)), street, apartment, zip_code, precinct,
+               rng.choice(LAST_NAMES), size)
+
+
+def synthetic_rows(count, seed=0):
+    """Yield count CSV row dicts, several voters per household.
+
+    The same seed always gives the same rows, so files of the same size
+    can be compared across commits.
+    """
+    rng = random.Random(seed)
+    households = synthetic_households(rng)
+    produced = 0
+    while produced < count:
+        number, street, apartment, zip_code, precinct, surname, size = next(households)
+        party = rng.choices(PARTIES, PARTY_WEIGHTS)[0]
+
+        for _ in range(min(size, count - produced)):
+            birth = date(1920, 1, 1) + timedelta(days=rng.randrange(86 * 365))
+            registered = birth + timedelta(days=18 * 365 + rng.randrange(30 * 365))
+            if registered > LAST_ELECTION:
+                registered = LAST_ELECTION
+
+            # older voters turn out more often
+            age_factor = min((LAST_ELECTION.year - birth.year) / 60, 1.3)
+            voted = {e: rng.random() < turnout * age_factor for e, turnout in TURNOUT.items()}
+
+            row = {
+                'Voter ID Number': ''.join(rng.choices(string.ascii_uppercase + string.digits, k=9)),
+                'Last Name': surname if rng.random() < 0.8 else rng.choice(LAST_NAMES),
+                'First Name': rng.choice(FIRST_NAMES),
+                'Residential Address - Street Number': number,
+                'Residential Address - Street Name': street,
+                'Residential Address - Apartment Number': apartment,
+                'Residential Address - Zip Code': zip_code,
+                'Date of Birth': birth.isoformat(),
+                'Date of Registration': registered.isoformat(),
+                # members of a household usually share a party
+                'Party Affiliation': (party if rng.random() < 0.7
+                                      else rng.choices(PARTIES, PARTY_WEIGHTS)[0]),
+                'Precinct Number': precinct,
+                'voter_score': str(sum(voted.values())),
+            }
+            row.update({e: 'TRUE' if v else 'FALSE' for e, v in voted.items()})
+
+            if rng.random() < MALFORMED_RATE:
+                row['Date of Registration'] = MALFORMED_DATE
+            if rng.random() < MALFORMED_RATE / 10:
+                row['Date of Birth'] = MALFORMED_DATE
+
+            yield row
+            produced += 1
+
+
+def write_synthetic_csv(filename, count, seed=0):
+    """Write a synthetic voter CSV of count rows, streaming so any size fits in memory.
+    Returns: number of rows written
+    """
+    written = 0
+    with open(filename, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for row in synthetic_rows(count, seed):
+            writer.writerow(row)
+            written += 1
+    return written
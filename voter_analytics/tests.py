@@ -0,0 +1,859 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .columnar import ColumnarVoters, np
+from .filters import FilterResultCache, VoterFilter, result_cache
+from .models import (ROLLUP_FIELDS, DataVersion, Household, PrecinctStats, Voter,
+                     VoterRollup, bump_data_version, get_data_version,
+                     load_data, sync_data)
+from .synthetic import CSV_COLUMNS, MALFORMED_DATE, synthetic_rows, write_synthetic_csv
+from .snapshot import SnapshotError, VoterSnapshot, write_snapshot
+from .pagination import encode_cursor
+from .search import VoterSearchResults, match_expression
+from .views import EXPORT_FIELDS
+from .parsing import VOTER_CSV_FIELDS, read_voter_csv, read_voter_csv_parallel, split_csv
+from .stats import (can_query_concurrently, filter_form_metadata, filtered_graph_data,
+                    filtered_voter_count, graph_data, graph_data_async, on_own_connection)
+
+
+CSV_HEADER = [
+    'Voter ID Number', 'Last Name', 'First Name',
+    'Residential Address - Street Number', 'Residential Address - Street Name',
+    'Residential Address - Apartment Number', 'Residential Address - Zip Code',
+    'Date of Birth', 'Date of Registration', 'Party Affiliation',
+    'Precinct Number', 'v20state', 'v21town', 'v21primary', 'v22general',
+    'v23town', 'voter_score',
+]
+
+
+def make_row(i, **overrides):
+    """Build one CSV row shaped like the Newton voter file."""
+    row = {
+        'Voter ID Number': f'ID{i:06d}',
+        'Last Name': f'LAST{i % 50:02d}',
+        'First Name': f'FIRST{i:04d}',
+        'Residential Address - Street Number': str(i % 300 + 1),
+        'Residential Address - Street Name': 'WALNUT ST',
+        'Residential Address - Apartment Number': '',
+        'Residential Address - Zip Code': '02460',
+        'Date of Birth': f'{1940 + i % 60}-03-15',
+        'Date of Registration': '2000-01-00',
+        'Party Affiliation': ['D ', 'R ', 'U '][i % 3],
+        'Precinct Number': str(i % 8 + 1),
+        'v20state': 'TRUE' if i % 2 else 'FALSE',
+        'v21town': 'TRUE' if i % 3 else 'FALSE',
+        'v21primary': 'TRUE' if i % 7 == 0 else 'FALSE',
+        'v22general': 'TRUE',
+        'v23town': 'TRUE' if i % 5 == 0 else 'FALSE',
+        'voter_score': str(i % 6),
+    }
+    row.update(overrides)
+    return row
+
+
+class VoterCSVMixin:
+    """Test mixin that writes a temporary voter CSV for each test."""
+
+    def write_csv(self, rows):
+        """Write rows to a temporary CSV file and return its path."""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_HEADER)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class VoterCSVTestCase(VoterCSVMixin, TestCase):
+    """Base class for tests that load voter CSVs inside a test transaction."""
+
+
+class LoadDataTests(VoterCSVTestCase):
+    """Verify the streaming voter import."""
+
+    def test_load_data_in_batches(self):
+        """All rows are loaded even when they span several batches."""
+        path = self.write_csv([make_row(i) for i in range(25)])
+
+        count = load_data(filename=path, batch_size=10, verbose=False)
+
+        self.assertEqual(count, 25)
+        self.assertEqual(Voter.objects.count(), 25)
+        # invalid dates like 2000-01-00 fall back to the default date
+        voter = Voter.objects.get(first_name='FIRST0003')
+        self.assertEqual(voter.date_of_registration.year, 1900)
+        self.assertTrue(voter.v20state)
+
+    def test_load_data_replaces_existing_rows(self):
+        """Reloading the same file does not duplicate voters."""
+        path = self.write_csv([make_row(i) for i in range(5)])
+
+        load_data(filename=path, verbose=False)
+        load_data(filename=path, verbose=False)
+
+        self.assertEqual(Voter.objects.count(), 5)
+
+
+class SyncDataTests(VoterCSVTestCase):
+    """Verify the incremental voter import."""
+
+    def test_sync_applies_only_changes(self):
+        """New, changed and removed rows are applied; others keep their pk."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(6)]), verbose=False)
+        kept = Voter.objects.get(first_name='FIRST0001')
+
+        # row 0 is removed, row 2 changes party, row 9 is new
+        rows = [make_row(i) for i in range(1, 6)] + [make_row(9)]
+        rows[1] = make_row(2, **{'Party Affiliation': 'L '})
+        summary = sync_data(filename=self.write_csv(rows), batch_size=2, verbose=False)
+
+        self.assertEqual(summary, {'created': 1, 'updated': 1, 'deleted': 1, 'unchanged': 4})
+        self.assertEqual(Voter.objects.count(), 6)
+        self.assertEqual(Voter.objects.get(first_name='FIRST0001').pk, kept.pk)
+        self.assertEqual(Voter.objects.get(first_name='FIRST0002').party_affiliation, 'L ')
+        self.assertFalse(Voter.objects.filter(first_name='FIRST0000').exists())
+
+    def test_sync_without_changes_does_nothing(self):
+        """An unchanged file rebuilds nothing and keeps every cache valid."""
+        path = self.write_csv([make_row(i) for i in range(30)])
+        load_data(filename=path, verbose=False)
+        version = get_data_version()
+
+        # reading the voters is the only query besides the savepoint pair
+        with self.assertNumQueries(3):
+            summary = sync_data(filename=path, verbose=False)
+        self.assertEqual(summary['unchanged'], 30)
+        self.assertEqual(get_data_version(), version)
+
+    def test_sync_updates_derived_tables_incrementally(self):
+        """After a sync, the rollup, households, precincts and search match a full load."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(40)]), verbose=False)
+        household_pk = Household.objects.get(street_number='40').pk
+        rows = [make_row(i) for i in range(1, 40)] + [make_row(90, **{'Last Name': 'ZEPHYR'})]
+        rows[4] = make_row(5, **{'Party Affiliation': 'L ', 'Precinct Number': '9',
+                                 'Last Name': 'QUINCE'})
+        path = self.write_csv(rows)
+        sync_data(filename=path, verbose=False)
+
+        def derived():
+            return (sorted(VoterRollup.objects.values_list(*ROLLUP_FIELDS, 'count')),
+                    sorted(Household.objects.values_list('street_number', 'precinct_number',
+                                                         'voter_count')),
+                    sorted(PrecinctStats.objects.values_list('precinct_number', 'voter_count',
+                                                             'household_count', 'party_counts')),
+                    [len(VoterSearchResults(name)) for name in ('quince', 'zephyr', 'last00')])
+
+        synced = derived()
+        self.assertEqual(synced[3], [1, 1, 0])
+        # unaffected households keep their primary key
+        self.assertEqual(Household.objects.get(street_number='40').pk, household_pk)
+        load_data(filename=path, verbose=False)
+        self.assertEqual(synced, derived())
+
+
+class ParallelParsingTests(VoterCSVTestCase):
+    """Verify the multi-process CSV parser."""
+
+    def test_chunks_align_on_rows(self):
+        """Every byte range starts right after a newline."""
+        path = self.write_csv([make_row(i) for i in range(40)])
+        fieldnames, ranges = split_csv(path, chunk_bytes=300)
+
+        self.assertEqual(fieldnames, CSV_HEADER)
+        self.assertGreater(len(ranges), 1)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for start, end in ranges:
+            self.assertEqual(data[start - 1:start], b'\n')
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_parallel_matches_serial(self):
+        """The process pool yields the same rows, in order, as the serial reader."""
+        path = self.write_csv([make_row(i) for i in range(40)])
+
+        parallel = list(read_voter_csv_parallel(path, workers=2, chunk_bytes=300))
+
+        self.assertEqual(parallel, list(read_voter_csv(path)))
+
+
+class ParticipationMaskTests(VoterCSVTestCase):
+    """Verify the packed election participation filters."""
+
+    def setUp(self):
+        """Load voters with a mix of election flags."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(60)]), verbose=False)
+
+    def test_voted_in_all_matches_flags(self):
+        """voted_in_all agrees with filtering each boolean flag."""
+        expected = Voter.objects.filter(v20state=True, v23town=True)
+
+        voters = Voter.objects.voted_in_all('v20state', 'v23town')
+
+        self.assertGreater(voters.count(), 0)
+        self.assertEqual(set(voters), set(expected))
+
+    def test_voted_in_any_matches_flags(self):
+        """voted_in_any agrees with OR-ing the boolean flags."""
+        expected = Voter.objects.filter(v21primary=True) | Voter.objects.filter(v23town=True)
+
+        voters = Voter.objects.voted_in_any('v21primary', 'v23town')
+
+        self.assertEqual(set(voters), set(expected))
+
+    def test_save_updates_mask(self):
+        """Editing a flag and saving keeps the mask in sync."""
+        voter = Voter.objects.exclude(v21primary=True).first()
+        voter.v21primary = True
+        voter.save()
+
+        self.assertIn(voter, Voter.objects.voted_in_all('v21primary'))
+
+
+class QueryPlanTests(VoterCSVTestCase):
+    """Verify the filter form queries can use the voter indexes."""
+
+    def test_common_filters_use_indexes(self):
+        """None of the common filter combinations scans the whole table."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(300)]), verbose=False)
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command('explain_voter_queries', output=path, stdout=io.StringIO())
+
+        with open(path) as file:
+            results = json.load(file)
+        self.assertTrue(results)
+        self.assertEqual([r for r in results if r['full_scan']], [])
+
+    def test_birth_year_filter(self):
+        """Birth year filters match the year of date_of_birth."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(60)]), verbose=False)
+
+        voters = Voter.objects.filter_by_params({'min_dob': '1950', 'max_dob': '1959'})
+
+        self.assertEqual(voters.count(), 10)
+        self.assertTrue(all(1950 <= v.date_of_birth.year <= 1959 for v in voters))
+
+
+class GraphDataTests(VoterCSVTestCase):
+    """Verify the graph aggregations run in the database."""
+
+    def setUp(self):
+        """Load a small voter file."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(60)]), verbose=False)
+
+    def test_graph_data_counts(self):
+        """Histogram, party and election counts match the rows, in two queries."""
+        voters = Voter.objects.filter_by_params({'min_dob': '1950'})
+
+        with self.assertNumQueries(2):
+            data = graph_data(voters)
+
+        years = {}
+        for voter in voters:
+            years[voter.date_of_birth.year] = years.get(voter.date_of_birth.year, 0) + 1
+        self.assertEqual(data['birth_years'], sorted(years.items()))
+        self.assertEqual(sum(count for party, count in data['parties']), voters.count())
+        self.assertEqual(dict(data['elections'])['2020 State'],
+                         voters.filter(v20state=True).count())
+
+    def test_graphs_page_renders(self):
+        """The graphs page renders the filter form and fetches its figures."""
+        response = self.client.get(reverse('voter_analytics:graphs'), {'party': 'D ', 'v22general': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('voter_analytics:graph_data'))
+
+    def test_graph_data_endpoint_is_cached(self):
+        """The figure JSON is built once and then served from the cache."""
+        url = reverse('voter_analytics:graph_data')
+        params = {'party': 'D ', 'v22general': 'true'}
+
+        figures = json.loads(self.client.get(url, params).content)
+        # a repeat only looks up the data version
+        with self.assertNumQueries(1):
+            repeat = self.client.get(url, params)
+
+        self.assertEqual(json.loads(repeat.content), figures)
+        self.assertEqual(set(figures), {'birth_year', 'party', 'elections'})
+        self.assertEqual(figures['elections']['layout']['title']['text'],
+                         'Voter Participation by Election')
+        self.assertEqual(sum(figures['party']['data'][0]['values']),
+                         Voter.objects.filter(party_affiliation='D ', v22general=True).count())
+
+
+class VoterRollupTests(VoterCSVTestCase):
+    """Verify the pre-aggregated voter statistics."""
+
+    def setUp(self):
+        """Load a small voter file, which builds the rollup."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(90)]), verbose=False)
+
+    def test_rollup_matches_voter_table(self):
+        """Graph data from the rollup equals graph data from the raw table."""
+        self.assertTrue(VoterRollup.objects.exists())
+        for params in [{}, {'party': 'R '}, {'min_dob': '1960', 'max_dob': '1985'},
+                       {'voter_score': '3', 'v20state': 'true'},
+                       {'party': 'D ', 'v21town': 'true', 'v23town': 'true'}]:
+            with self.subTest(params=params):
+                self.assertEqual(filtered_graph_data(VoterFilter.from_params(params)),
+                                 graph_data(Voter.objects.filter_by_params(params)))
+
+    def test_voter_edits_adjust_rollup(self):
+        """Saving, adding and deleting voters keep the rollup in step with the voter table."""
+        voter = Voter.objects.first()
+        voter.party_affiliation = 'G '
+        voter.save()
+        Voter.objects.last().delete()
+        Voter.objects.create(**{**Voter.objects.values(*VOTER_CSV_FIELDS).first(),
+                                'last_name': 'NEWCOMER', 'party_affiliation': 'L ',
+                                'voter_score': 5})
+
+        self.assertTrue(VoterRollup.objects.exists())
+        self.assertEqual(dict(filtered_graph_data(VoterFilter())['parties'])['G '], 1)
+        for params in [{}, {'party': 'G '}, {'party': 'L '}, {'voter_score': '5'}]:
+            with self.subTest(params=params):
+                self.assertEqual(filtered_graph_data(VoterFilter.from_params(params)),
+                                 graph_data(Voter.objects.filter_by_params(params)))
+        self.assertFalse(VoterRollup.objects.filter(count__lte=0).exists())
+
+
+class FilterFormMetadataTests(VoterCSVTestCase):
+    """Verify the cached filter form dropdown values."""
+
+    def test_metadata_cached_per_data_version(self):
+        """Metadata is computed once per import and recomputed after the next one."""
+        cache.clear()
+        load_data(filename=self.write_csv([make_row(i) for i in range(30)]), verbose=False)
+        version = get_data_version()
+
+        metadata = filter_form_metadata()
+        # only the data version lookup runs on a cache hit
+        with self.assertNumQueries(1):
+            self.assertEqual(filter_form_metadata(), metadata)
+        self.assertEqual(metadata['parties'], ['D ', 'R ', 'U '])
+        self.assertEqual((metadata['min_year'], metadata['max_year']), (1940, 1969))
+
+        load_data(filename=self.write_csv([make_row(i, **{'Party Affiliation': 'G '})
+                                           for i in range(3)]), verbose=False)
+
+        self.assertNotEqual(get_data_version(), version)
+        self.assertEqual(filter_form_metadata()['parties'], ['G '])
+        # every change rewrites the same row rather than adding one
+        self.assertEqual(DataVersion.objects.count(), 1)
+
+    def test_voter_list_renders(self):
+        """The voter list renders the cached dropdowns."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(30)]), verbose=False)
+
+        response = self.client.get(reverse('voter_analytics:voters'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<option value="1969"')
+        # scores are listed 0 to 5 even when the data only uses some of them
+        self.assertEqual(list(response.context['voter_scores']), list(range(6)))
+
+
+class KeysetPaginationTests(VoterCSVTestCase):
+    """Verify cursor pagination of the voter list."""
+
+    def setUp(self):
+        """Load enough voters for three and a half pages."""
+        cache.clear()
+        load_data(filename=self.write_csv([make_row(i) for i in range(350)]), verbose=False)
+        self.url = reverse('voter_analytics:voters')
+
+    def test_next_cursor_walks_every_voter_in_order(self):
+        """Following next cursors visits each voter exactly once, in list order."""
+        seen = []
+        params = {}
+        while True:
+            response = self.client.get(self.url, params)
+            page = response.context['page_obj']
+            seen.extend(voter.pk for voter in page)
+            if not page.has_next():
+                break
+            params = {'cursor': page.next_cursor}
+
+        expected = list(Voter.objects.order_by('last_name', 'first_name', 'id')
+                                     .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 4)
+        self.assertEqual(page.paginator.num_pages, 4)
+
+    def test_previous_and_last_cursors(self):
+        """Previous returns to the earlier page and Last shows the remainder."""
+        first = self.client.get(self.url).context['page_obj']
+        second = self.client.get(self.url, {'cursor': first.next_cursor}).context['page_obj']
+        back = self.client.get(self.url, {'cursor': second.previous_cursor}).context['page_obj']
+        last = self.client.get(self.url, {'cursor': first.last_cursor}).context['page_obj']
+
+        self.assertEqual([v.pk for v in back], [v.pk for v in first])
+        self.assertEqual(back.number, 1)
+        self.assertFalse(back.has_previous())
+        self.assertEqual((last.number, len(last)), (4, 50))
+        self.assertFalse(last.has_next())
+
+    def test_malformed_cursors_show_first_page(self):
+        """Forged or damaged cursors fall back to the first page instead of failing."""
+        first = [v.pk for v in self.client.get(self.url).context['page_obj']]
+        for cursor in [encode_cursor('next', 2, None), encode_cursor('next', 2, []),
+                       encode_cursor('next', 2, ['a']), encode_cursor('prev', 2, ['a', 'b', 'x']),
+                       encode_cursor('next', 2, ['a', {'b': 1}, 3]),
+                       encode_cursor('next', True, ['a', 'b', 3]),
+                       encode_cursor('next', 2, ['ZZZ', 'ZZZ', 2 ** 70]),
+                       encode_cursor('prev', 2, ['', '', 0]), 'not-a-cursor']:
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([v.pk for v in response.context['page_obj']], first)
+
+    def test_filters_apply_to_every_page(self):
+        """Cursor links keep the filters and the count matches the filter."""
+        response = self.client.get(self.url, {'party': 'R '})
+        page = response.context['page_obj']
+
+        self.assertEqual(page.paginator.count, Voter.objects.filter(party_affiliation='R ').count())
+        self.assertIn('party=R+', response.context['filter_query'])
+        self.assertTrue(all(v.party_affiliation == 'R ' for v in page))
+
+
+class FilterSignatureTests(VoterCSVTestCase):
+    """Verify normalized filters and the shared result cache."""
+
+    def test_equivalent_params_give_equal_filters(self):
+        """Parameter order, blanks and bad numbers do not change the signature."""
+        a = VoterFilter.from_params({'v23town': 'true', 'party': 'D ', 'min_dob': '1950',
+                                     'voter_score': '', 'v20state': 'on'})
+        b = VoterFilter.from_params({'party': 'D ', 'v20state': 'true', 'min_dob': '1950',
+                                     'v23town': 'true', 'max_dob': 'abc'})
+
+        self.assertEqual(a, b)
+        self.assertEqual(a.signature, b.signature)
+        self.assertEqual(a.elections, ('v20state', 'v23town'))
+
+    def test_lru_eviction_and_metrics(self):
+        """The least recently used result is evicted and hits/misses are counted."""
+        results = FilterResultCache(maxsize=2)
+        f1, f2, f3 = VoterFilter(party='D '), VoterFilter(party='R '), VoterFilter(party='U ')
+
+        results.get_or_compute('count', f1, 'v1', lambda: 1)
+        results.get_or_compute('count', f2, 'v1', lambda: 2)
+        self.assertEqual(results.get_or_compute('count', f1, 'v1', lambda: 0), 1)
+        results.get_or_compute('count', f3, 'v1', lambda: 3)
+        # f2 was least recently used, so it is recomputed
+        self.assertEqual(results.get_or_compute('count', f2, 'v1', lambda: 20), 20)
+
+        info = results.info()
+        self.assertEqual((info['hits'], info['misses'], info['evictions']), (1, 4, 2))
+
+    def test_repeat_requests_hit_cache(self):
+        """A repeated filter combination is served from the result cache."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(30)]), verbose=False)
+        result_cache.clear()
+        params = {'party': 'D ', 'min_dob': '1950'}
+
+        self.client.get(reverse('voter_analytics:voters'), params)
+        self.client.get(reverse('voter_analytics:voters'), params)
+
+        self.assertEqual(result_cache.info()['misses'], 1)
+        self.assertEqual(result_cache.info()['hits'], 1)
+
+
+class VoterExportTests(VoterCSVTestCase):
+    """Verify the streaming voter export."""
+
+    def setUp(self):
+        """Load a small voter file."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(1200)]), verbose=False)
+        self.url = reverse('voter_analytics:export')
+
+    def test_csv_export_streams_filtered_rows(self):
+        """The CSV export streams a header plus every matching voter."""
+        response = self.client.get(self.url, {'party': 'D ', 'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'last_name', 'first_name'])
+        self.assertEqual(len(rows) - 1, Voter.objects.filter(party_affiliation='D ').count())
+        self.assertTrue(all(row[9] == 'D ' for row in rows[1:]))
+
+    def test_ndjson_export(self):
+        """The NDJSON export writes one JSON object per voter."""
+        response = self.client.get(self.url, {'format': 'ndjson', 'v23town': 'true'})
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), Voter.objects.filter(v23town=True).count())
+        self.assertTrue(all(record['v23town'] for record in records))
+        self.assertRegex(records[0]['date_of_birth'], r'^\d{4}-\d{2}-\d{2}$')
+
+    def test_export_applies_search(self):
+        """The export links keep the search, which limits and orders the rows like the list."""
+        response = self.client.get(self.url, {'q': 'zzzznotaname', 'format': 'csv'})
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(),
+                         [','.join(EXPORT_FIELDS)])
+
+        params = {'q': 'last07', 'party': 'R ', 'format': 'ndjson'}
+        response = self.client.get(self.url, params)
+        records = [json.loads(line)
+                   for line in b''.join(response.streaming_content).decode().splitlines()]
+        matches = VoterSearchResults('last07', Voter.objects.filter(party_affiliation='R '))
+        self.assertEqual([record['id'] for record in records], matches.ranked_ids())
+        self.assertEqual(len(records), Voter.objects.filter(last_name='LAST07',
+                                                            party_affiliation='R ').count())
+
+
+@skipIf(np is None, 'numpy is not installed')
+class ColumnarEngineTests(VoterCSVTestCase):
+    """Verify the NumPy engine answers like the ORM."""
+
+    def setUp(self):
+        """Load a small voter file."""
+        load_data(filename=self.write_csv([make_row(i) for i in range(200)]), verbose=False)
+
+    def test_matches_orm(self):
+        """Counts and graph data agree with the database for several filters."""
+        engine = ColumnarVoters.from_queryset(Voter.objects.all())
+        for params in [{}, {'party': 'U '}, {'party': 'X '}, {'min_dob': '1955', 'max_dob': '1975'},
+                       {'voter_score': '4', 'v20state': 'true'},
+                       {'party': 'D ', 'v21town': 'true', 'v22general': 'true'}]:
+            with self.subTest(params=params):
+                voter_filter = VoterFilter.from_params(params)
+                voters = voter_filter.apply(Voter.objects.all())
+                self.assertEqual(engine.count(voter_filter), voters.count())
+                self.assertEqual(engine.graph_data(voter_filter), graph_data(voters))
+
+    @override_settings(VOTER_ANALYTICS_ENGINE='columnar')
+    def test_views_use_engine_when_enabled(self):
+        """With the setting on, cached counts come from the in-memory engine."""
+        result_cache.clear()
+        voter_filter = VoterFilter(party='R ')
+
+        self.assertEqual(filtered_voter_count(voter_filter),
+                         Voter.objects.filter(party_affiliation='R ').count())
+
+
+class VoterSearchTests(VoterCSVTestCase):
+    """Verify the full-text voter search and its index upkeep."""
+
+    def setUp(self):
+        """Load voters, a few with distinctive names and streets."""
+        rows = [make_row(i) for i in range(150)]
+        rows.append(make_row(150, **{'Last Name': 'OBRIEN', 'First Name': 'MAUREEN'}))
+        rows.append(make_row(151, **{'Last Name': 'SMITH', 'First Name': 'OBRIEN',
+                                     'Residential Address - Street Name': 'OBRIEN RD'}))
+        rows.append(make_row(152, **{'Last Name': 'OBRIENSKI', 'First Name': 'ANNA'}))
+        load_data(filename=self.write_csv(rows), verbose=False)
+
+    def names(self, query, voters=None):
+        """Last names of every search result, in rank order."""
+        return [v.last_name for v in VoterSearchResults(query, voters)[0:50]]
+
+    def test_match_expression_quotes_words(self):
+        """Operators and punctuation in the input are not passed to FTS5."""
+        self.assertEqual(match_expression('O\'Brien NEAR "x'), '"o"* "brien"* "near"* "x"*')
+        self.assertEqual(match_expression('  --  '), '')
+
+    def test_prefix_search_ranks_surnames_first(self):
+        """A prefix matches every column, with last name matches ranked highest."""
+        self.assertEqual(self.names('obri'), ['OBRIEN', 'OBRIENSKI', 'SMITH'])
+        self.assertEqual(self.names('maureen obr'), ['OBRIEN'])
+        self.assertEqual(VoterSearchResults('last07').count(), 3)
+        self.assertEqual(VoterSearchResults('nobody').count(), 0)
+
+    def test_search_within_filter(self):
+        """Results can be limited to the voters selected by the filter form."""
+        voters = VoterFilter(party='U ').apply(Voter.objects.all())
+        self.assertEqual(self.names('last07', voters), ['LAST07'])
+
+    def test_index_follows_edits_and_reloads(self):
+        """Saving or deleting a voter updates the index, and load_data rebuilds it."""
+        voter = Voter.objects.get(last_name='OBRIEN')
+        voter.last_name = 'BRYANT'
+        voter.save()
+        self.assertEqual(self.names('bry'), ['BRYANT'])
+        voter.delete()
+        self.assertEqual(self.names('bry'), [])
+
+        load_data(filename=self.write_csv([make_row(i) for i in range(5)]), verbose=False)
+        self.assertEqual(VoterSearchResults('obrien').count(), 0)
+        self.assertEqual(VoterSearchResults('walnut').count(), 5)
+
+    def test_list_view_search_mode(self):
+        """The voter list pages search results by number."""
+        url = reverse('voter_analytics:voters')
+        response = self.client.get(url, {'q': 'walnut', 'page': 2})
+        page = response.context['page_obj']
+        self.assertTrue(response.context['search_mode'])
+        self.assertEqual(page.paginator.count, 152)
+        self.assertEqual(len(page.object_list), 52)
+        self.assertContains(response, 'page=1')
+
+
+class VoterSnapshotTests(VoterCSVTestCase):
+    """Verify binary snapshots round-trip the CSV and catch bad files."""
+
+    def setUp(self):
+        """Write a CSV, including non-ASCII text and a bad date, and its snapshot."""
+        rows = [make_row(i) for i in range(40)]
+        rows.append(make_row(40, **{'Last Name': 'MÜLLER', 'Date of Birth': '1900-01-00'}))
+        self.csv_path = self.write_csv(rows)
+        self.path = self.csv_path + '.snap'
+        self.addCleanup(os.remove, self.path)
+        write_snapshot(self.csv_path, self.path)
+
+    def test_round_trip(self):
+        """Reading a snapshot gives exactly what parsing the CSV gives."""
+        with VoterSnapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.rows, 41)
+            self.assertEqual(list(snapshot), list(read_voter_csv(self.csv_path)))
+            self.assertEqual(snapshot.column('birth_year')[40], 1900)
+
+    def test_load_data_from_snapshot(self):
+        """load_data accepts a snapshot in place of the CSV."""
+        self.assertEqual(load_data(filename=self.path, verbose=False), 41)
+        voter = Voter.objects.get(last_name='MÜLLER')
+        self.assertEqual(voter.participation_mask, 0b11010)
+        self.assertEqual(voter.date_of_birth.isoformat(), '1900-01-01')
+        self.assertEqual(Voter.objects.filter(v22general=True).count(), 41)
+
+    def test_corrupt_snapshot_is_rejected(self):
+        """Flipping a byte in a column block fails the checksum."""
+        with VoterSnapshot(self.path) as snapshot:
+            offset = snapshot._data_start
+        with open(self.path, 'r+b') as file:
+            file.seek(offset)
+            byte = file.read(1)
+            file.seek(offset)
+            file.write(bytes([byte[0] ^ 0xFF]))
+        with self.assertRaisesRegex(SnapshotError, 'checksum'):
+            VoterSnapshot(self.path)
+
+    def test_stale_snapshot_is_rejected(self):
+        """A snapshot older than a changed CSV is refused."""
+        with open(self.csv_path, 'a', encoding='utf-8', newline='') as file:
+            csv.DictWriter(file, fieldnames=CSV_HEADER).writerow(make_row(41))
+        with self.assertRaisesRegex(SnapshotError, 'stale'):
+            load_data(filename=self.path, verbose=False)
+        self.assertEqual(Voter.objects.count(), 0)
+
+    def test_snapshot_without_csv_is_unverifiable(self):
+        """A snapshot whose CSV has been removed is refused rather than trusted."""
+        os.rename(self.csv_path, self.csv_path + '.moved')
+        self.addCleanup(os.rename, self.csv_path + '.moved', self.csv_path)
+        with self.assertRaisesRegex(SnapshotError, 'unverifiable'):
+            VoterSnapshot(self.path)
+        with self.assertRaises(CommandError):
+            call_command('snapshot_voters', check=True, file=self.csv_path,
+                         output=self.path, stdout=io.StringIO())
+        with self.assertRaisesRegex(CommandError, 'unverifiable'):
+            call_command('load_voters', file=self.path, stdout=io.StringIO())
+
+        # restoring the snapshot on its own is an explicit choice
+        with redirect_stdout(io.StringIO()):
+            call_command('load_voters', file=self.path, trust_snapshot=True)
+        self.assertEqual(Voter.objects.count(), 41)
+
+    def test_mask_holds_more_than_eight_elections(self):
+        """Participation masks with bits past the eighth election survive a round trip."""
+        def with_ninth_election(filename):
+            for fields in read_voter_csv(filename):
+                yield {**fields, 'participation_mask': fields['participation_mask'] | 1 << 8}
+
+        with mock.patch('voter_analytics.snapshot.read_voter_csv', with_ninth_election):
+            write_snapshot(self.csv_path, self.path)
+        with VoterSnapshot(self.path) as snapshot:
+            self.assertTrue(all(mask >> 8 == 1 for mask in snapshot.column('participation_mask')))
+
+
+class AsyncGraphDataTests(VoterCSVMixin, TransactionTestCase):
+    """Verify the concurrent aggregates, which need committed rows to see."""
+
+    def setUp(self):
+        """Load a small voter file outside of a test transaction."""
+        result_cache.clear()
+        load_data(filename=self.write_csv([make_row(i) for i in range(60)]), verbose=False)
+
+    def test_concurrent_graph_data_matches(self):
+        """Running the grouped queries on worker connections gives the same data."""
+        self.assertTrue(can_query_concurrently())
+        for rollup, model in [(False, Voter), (True, VoterRollup)]:
+            voters = VoterFilter(party='U ', min_year=1950).apply(model.objects.all())
+            with mock.patch('voter_analytics.stats.on_own_connection',
+                            wraps=on_own_connection) as worker:
+                concurrent = async_to_sync(graph_data_async)(voters, rollup)
+            # one worker thread per grouped query
+            self.assertEqual(worker.call_count, 2)
+            self.assertEqual(concurrent, graph_data(voters, rollup))
+
+    def test_transaction_runs_queries_in_turn(self):
+        """Inside a transaction the queries stay on this connection, which sees its rows."""
+        with transaction.atomic():
+            Voter.objects.filter(party_affiliation='U ').update(party_affiliation='G ')
+            voters = VoterFilter(party='G ').apply(Voter.objects.all())
+            with mock.patch('voter_analytics.stats.on_own_connection',
+                            wraps=on_own_connection) as worker:
+                data = async_to_sync(graph_data_async)(voters)
+            self.assertEqual(worker.call_count, 0)
+            self.assertEqual(data, graph_data(voters))
+            transaction.set_rollback(True)
+
+    def test_async_endpoint(self):
+        """The async endpoint returns the three figures."""
+        response = self.client.get(reverse('voter_analytics:graph_data'), {'party': 'R '})
+        self.assertEqual(set(response.json()), {'birth_year', 'party', 'elections'})
+
+
+class HouseholdPrecinctTests(VoterCSVTestCase):
+    """Verify the household and precinct tables and their pages."""
+
+    def setUp(self):
+        """Load voters, three of whom share voter 0's address."""
+        rows = [make_row(i) for i in range(60)]
+        rows += [make_row(i, **{'Residential Address - Street Number': '1',
+                                'Precinct Number': '1'}) for i in range(60, 63)]
+        load_data(filename=self.write_csv(rows), verbose=False)
+
+    def test_tables_built_by_load(self):
+        """Households group voters by address and precinct stats match the voters."""
+        self.assertEqual(Household.objects.count(), 60)
+        household = Household.for_voter(Voter.objects.get(first_name='FIRST0000'))
+        self.assertEqual(household.voter_count, 4)
+        self.assertEqual(household.voters().count(), 4)
+
+        precinct = PrecinctStats.objects.get(precinct_number='1')
+        voters = Voter.objects.filter(precinct_number='1')
+        self.assertEqual(precinct.voter_count, voters.count())
+        self.assertEqual(precinct.household_count, 8)
+        self.assertEqual(precinct.party_counts['D '], voters.filter(party_affiliation='D ').count())
+        self.assertEqual(precinct.election_counts['v20state'], voters.filter(v20state=True).count())
+
+    def test_edit_refreshes_both_precincts(self):
+        """Moving a voter updates the old and new precinct and their households."""
+        voter = Voter.objects.get(first_name='FIRST0060')
+        voter.precinct_number = '2'
+        voter.save()
+
+        self.assertEqual(Household.for_voter(Voter.objects.get(first_name='FIRST0000')).voter_count, 3)
+        self.assertEqual(PrecinctStats.objects.get(precinct_number='1').voter_count,
+                         Voter.objects.filter(precinct_number='1').count())
+        self.assertEqual(PrecinctStats.objects.get(precinct_number='2').household_count, 9)
+
+    def test_household_ids_are_stable(self):
+        """Edits and reloads keep each address's primary key, and empty addresses go."""
+        household = Household.objects.get(street_number='1', precinct_number='1')
+        voter = Voter.objects.get(first_name='FIRST0061')
+        voter.voter_score = 5
+        voter.save()
+        self.assertEqual(Household.objects.get(pk=household.pk).voter_count, 4)
+
+        # drop the three extra residents and voter 59's address
+        load_data(filename=self.write_csv([make_row(i) for i in range(59)]), verbose=False)
+        self.assertEqual(Household.objects.get(pk=household.pk).voter_count, 1)
+        self.assertEqual(Household.objects.count(), 59)
+
+    def test_canvassing_page(self):
+        """A precinct page renders from a fixed, small number of queries."""
+        url = reverse('voter_analytics:precinct', kwargs={'precinct': '1'})
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['households']), 8)
+        self.assertEqual(len(response.context['households'][0].residents), 4)
+        self.assertContains(response, 'FIRST0061')
+
+    def test_household_page(self):
+        """The household page lists everyone at the address."""
+        household = Household.objects.get(street_number='1', precinct_number='1')
+        response = self.client.get(reverse('voter_analytics:household', kwargs={'pk': household.pk}))
+        self.assertEqual(len(response.context['voters']), 4)
+
+    def test_blank_precinct_pages_render(self):
+        """A voter without a precinct has no precinct link instead of breaking the pages."""
+        voter = Voter.objects.get(first_name='FIRST0005')
+        voter.precinct_number = ''
+        voter.save()
+
+        urls = [reverse('voter_analytics:voter', kwargs={'pk': voter.pk}),
+                reverse('voter_analytics:household', kwargs={'pk': Household.for_voter(voter).pk}),
+                reverse('voter_analytics:precincts')]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SyntheticDataTests(VoterCSVTestCase):
+    """Verify the synthetic voter file generator."""
+
+    def test_rows_are_repeatable_and_newton_shaped(self):
+        """A seed always gives the same rows, with the real file's columns and bad dates."""
+        rows = list(synthetic_rows(3000, seed=7))
+        self.assertEqual(rows, list(synthetic_rows(3000, seed=7)))
+        self.assertEqual(set(rows[0]), set(CSV_COLUMNS))
+        self.assertTrue(any(row['Date of Registration'] == MALFORMED_DATE for row in rows))
+
+    def test_generated_file_loads(self):
+        """load_data reads a generated file, grouping voters into shared households."""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.assertEqual(write_synthetic_csv(path, 500, seed=1), 500)
+
+        self.assertEqual(load_data(filename=path, verbose=False), 500)
+        self.assertLess(Household.objects.count(), 500)
+        self.assertTrue(Voter.objects.filter(date_of_registration='1900-01-01').exists())
+
+
+class VoterDetailCacheTests(VoterCSVTestCase):
+    """Verify the cached voter detail page."""
+
+    def setUp(self):
+        """Load a few voters."""
+        cache.clear()
+        load_data(filename=self.write_csv([make_row(i) for i in range(5)]), verbose=False)
+        self.voter = Voter.objects.order_by('pk').first()
+        self.url = reverse('voter_analytics:voter', kwargs={'pk': self.voter.pk})
+
+    def test_page_cached_until_voter_changes(self):
+        """A repeat visit only reads the data version, and an edit or reload expires the page."""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, self.voter.first_name)
+
+        self.voter.first_name = 'RENAMED'
+        self.voter.save()
+        self.assertContains(self.client.get(self.url), 'RENAMED')
+
+        load_data(filename=self.write_csv([make_row(i, **{'First Name': 'RELOADED'})
+                                           for i in range(5)]), verbose=False)
+        pk = Voter.objects.order_by('pk').first().pk
+        self.assertContains(self.client.get(reverse('voter_analytics:voter', kwargs={'pk': pk})),
+                            'RELOADED')
+
+    def test_import_in_another_process_expires_page(self):
+        """A version bumped by another process, e.g. load_voters, expires the page here."""
+        self.client.get(self.url)
+        Voter.objects.filter(pk=self.voter.pk).update(first_name='ELSEWHERE')
+        bump_data_version('load')
+        self.assertContains(self.client.get(self.url), 'ELSEWHERE')
+
+    def test_missing_voter_is_not_cached(self):
+        """An unknown primary key is still a 404."""
+        url = reverse('voter_analytics:voter', kwargs={'pk': 999999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -4,7 +4,9 @@
 # Description: URL configuration for voter_analytics app
 
 from django.urls import path
-from .views import VoterListView, VoterDetailView, GraphsView
+from .views import (VoterListView, VoterDetailView, GraphsView, GraphDataView,
+                    VoterExportView, PrecinctListView, PrecinctDetailView,
+                    HouseholdDetailView)
 
 app_name = 'voter_analytics'
 
@@ -13,6 +15,14 @@ urlpatterns = [
     path('', VoterListView.as_view(), name='voters'),
     # detail page for a single voter
     path('voter/<int:pk>', VoterDetailView.as_view(), name='voter'),
+    # precinct summaries, canvassing sheets and households
+    path('precincts', PrecinctListView.as_view(), name='precincts'),
+    path('precinct/<str:precinct>', PrecinctDetailView.as_view(), name='precinct'),
+    path('household/<int:pk>', HouseholdDetailView.as_view(), name='household'),
     # graphs page
     path('graphs', GraphsView.as_view(), name='graphs'),
+    # figure specs fetched by the graphs page
+    path('graphs/data', GraphDataView.as_view(), name='graph_data'),
+    # download the filtered voter list as CSV or NDJSON
+    path('export', VoterExportView.as_view(), name='export'),
 ]
\ No newline at end of file
@@ -3,78 +3,58 @@
 # Date: October 2025
 # Description: Views for voter_analytics app
 
-from django.views.generic import ListView, DetailView
-from .models import Voter
-from django.db.models import Q
-
-
-class VoterListView(ListView):
-    """View to display a list of voters with filtering capabilities."""
-    model = Voter
-    template_name = 'voter_analytics/voter_list.html'
-    context_object_name = 'voters'
-    paginate_by = 100  # show 100 voters per page
-
-    def get_queryset(self):
-        """Filter the queryset based on form parameters."""
-        # start with all voters
-        queryset = super().get_queryset()
-
-        # get filter parameters from the GET request
-        party = self.request.GET.get('party')
-        min_dob_year = self.request.GET.get('min_dob')
-        max_dob_year = self.request.GET.get('max_dob')
-        voter_score = self.request.GET.get('voter_score')
-
-        # filter by party affiliation if provided
-        if party:
-            queryset = queryset.filter(party_affiliation=party)
-
-        # filter by minimum date of birth year
-        if min_dob_year:
-            # voters born after or in this year
-            queryset = queryset.filter(date_of_birth__year__gte=int(min_dob_year))
-
-        # filter by maximum date of birth year
-        if max_dob_year:
-            # voters born before or in this year
-            queryset = queryset.filter(date_of_birth__year__lte=int(max_dob_year))
-
-        # filter by voter score
-        if voter_score:
-            queryset = queryset.filter(voter_score=int(voter_score))
-
-        # filter by specific elections
-        if self.request.GET.get('v20state'):
-            queryset = queryset.filter(v20state=True)
-        if self.request.GET.get('v21town'):
-            queryset = queryset.filter(v21town=True)
-        if self.request.GET.get('v21primary'):
-            queryset = queryset.filter(v21primary=True)
-        if self.request.GET.get('v22general'):
-            queryset = queryset.filter(v22general=True)
-        if self.request.GET.get('v23town'):
-            queryset = queryset.filter(v23town=True)
-
-        # order by last name, then first name for consistent ordering
-        return queryset.order_by('last_name', 'first_name')
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.views.generic import ListView, DetailView, TemplateView
+from cs412.object_cache import cached_for_object
+from .models import HOUSEHOLD_FIELDS, Household, PrecinctStats, Voter, get_data_version
+from .charts import graph_figures_json_async
+from .filters import VoterFilter
+from .pagination import keyset_paginate
+from .search import VoterSearchResults, match_expression
+from .stats import ELECTION_LABELS, filtered_voter_count, filter_form_metadata
+
+# voter list sort order; backed by the voter_name_idx index
+VOTER_LIST_ORDER = ('last_name', 'first_name', 'id')
+
+# columns written by the voter export
+EXPORT_FIELDS = (
+    'id', 'last_name', 'first_name', 'street_number', 'street_name',
+    'apartment_number', 'zip_code', 'date_of_birth', 'date_of_registration',
+    'party_affiliation', 'precinct_number', 'v20state', 'v21town',
+    'v21primary', 'v22general', 'v23town', 'voter_score',
+)
+
+# rows fetched per database round trip, and rows joined into each chunk sent
+EXPORT_FETCH_SIZE = 2000
+EXPORT_LINES_PER_CHUNK = 500
+
+
+class VoterFilterFormMixin:
+    """Mixin adding the voter filter form's dropdowns and selections to the context."""
+
+    def get_voter_filter(self):
+        """Get the normalized filter for this request's GET parameters.
+        Returns: VoterFilter
+        """
+        if not hasattr(self, '_voter_filter'):
+            self._voter_filter = VoterFilter.from_params(self.request.GET)
+        return self._voter_filter
 
     def get_context_data(self, **kwargs):
         """Add filter form data to the context."""
         context = super().get_context_data(**kwargs)
 
-        # get all unique party affiliations for the dropdown
-        parties = Voter.objects.values_list('party_affiliation', flat=True).distinct().order_by('party_affiliation')
-        context['parties'] = parties
-
-        # create year range for birth year dropdowns
-        # find the min and max birth years
-        min_year = Voter.objects.order_by('date_of_birth').first().date_of_birth.year if Voter.objects.exists() else 1900
-        max_year = Voter.objects.order_by('-date_of_birth').first().date_of_birth.year if Voter.objects.exists() else 2023
-        context['year_range'] = range(min_year, max_year + 1)
-
-        # voter scores 0-5
-        context['voter_scores'] = range(6)
+        # dropdown values are cached until the next import
+        metadata = filter_form_metadata()
+        context['parties'] = metadata['parties']
+        context['year_range'] = range(metadata['min_year'], metadata['max_year'] + 1)
+        context['voter_scores'] = range(6)  # voter scores always run from 0 to 5
 
         # maintain filter values in the form
         context['selected_party'] = self.request.GET.get('party', '')
@@ -90,12 +70,73 @@ class VoterListView(ListView):
         return context
 
 
+class VoterListView(VoterFilterFormMixin, ListView):
+    """View to display a list of voters with filtering capabilities."""
+    model = Voter
+    template_name = 'voter_analytics/voter_list.html'
+    context_object_name = 'voters'
+    paginate_by = 100  # show 100 voters per page
+
+    def get_queryset(self):
+        """Filter the queryset based on form parameters."""
+        # start with all voters and apply the filter form
+        queryset = self.get_voter_filter().apply(super().get_queryset())
+
+        # order by last name, then first name for consistent ordering
+        return queryset.order_by(*VOTER_LIST_ORDER)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Paginate by seeking from a cursor instead of using OFFSET.
+
+        In search mode, results are in rank order rather than name order,
+        so they are paged by number from the search index instead.
+        Returns: (paginator, page, object_list, is_paginated) like ListView
+        """
+        search = self.request.GET.get('q', '')
+        if match_expression(search):
+            # only search within the filter form's voters if it selects any
+            voters = None if self.get_voter_filter() == VoterFilter() else queryset
+            paginator = Paginator(VoterSearchResults(search, voters), page_size)
+            page = paginator.get_page(self.request.GET.get('page'))
+            return (paginator, page, page.object_list, page.has_other_pages())
+
+        # the total comes from a cached count rather than COUNT(*) per page
+        count = filtered_voter_count(self.get_voter_filter())
+        page = keyset_paginate(queryset, VOTER_LIST_ORDER, page_size,
+                               self.request.GET.get('cursor'), count)
+        return (page.paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        """Add the search text and the filter query string used by the pagination links."""
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.request.GET.get('q', '')
+        context['search_mode'] = bool(match_expression(context['search_query']))
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        params.pop('page', None)
+        context['filter_query'] = params.urlencode()
+        return context
+
+
 class VoterDetailView(DetailView):
     """View to display details for a single voter."""
     model = Voter
     template_name = 'voter_analytics/voter_detail.html'
     context_object_name = 'voter'
 
+    def get(self, request, *args, **kwargs):
+        """Serve the rendered page from the object cache until the voter data changes.
+
+        The data version is one indexed read, and it changes in every
+        process when an import or edit happens in any of them.
+        Returns: HttpResponse
+        """
+        render_page = super().get
+        content = cached_for_object(
+            Voter, kwargs['pk'], 'detail_page', get_data_version(),
+            lambda: render_page(request, *args, **kwargs).render().content)
+        return HttpResponse(content)
+
     def get_context_data(self, **kwargs):
         """Add Google Maps link to context."""
         context = super().get_context_data(**kwargs)
@@ -108,155 +149,178 @@ class VoterDetailView(DetailView):
         encoded_address = urllib.parse.quote(address)
         context['google_maps_url'] = f"https://www.google.com/maps/search/?api=1&query={encoded_address}"
 
+        # link to everyone else at this address
+        context['household'] = Household.for_voter(voter)
+
         return context
 
 
-class GraphsView(ListView):
-    """View to display graphs of voter data."""
-    model = Voter
-    template_name = 'voter_analytics/graphs.html'
-    context_object_name = 'voters'
+class PrecinctListView(ListView):
+    """View to list every precinct's precomputed summary."""
+    model = PrecinctStats
+    template_name = 'voter_analytics/precinct_list.html'
+    context_object_name = 'precincts'
+    ordering = ['precinct_number']
 
-    def get_queryset(self):
-        """Filter the queryset based on form parameters."""
-        # start with all voters
-        queryset = super().get_queryset()
-
-        # get filter parameters from the GET request
-        party = self.request.GET.get('party')
-        min_dob_year = self.request.GET.get('min_dob')
-        max_dob_year = self.request.GET.get('max_dob')
-        voter_score = self.request.GET.get('voter_score')
-
-        # filter by party affiliation if provided
-        if party:
-            queryset = queryset.filter(party_affiliation=party)
-
-        # filter by minimum date of birth year
-        if min_dob_year:
-            queryset = queryset.filter(date_of_birth__year__gte=int(min_dob_year))
-
-        # filter by maximum date of birth year
-        if max_dob_year:
-            queryset = queryset.filter(date_of_birth__year__lte=int(max_dob_year))
-
-        # filter by voter score
-        if voter_score:
-            queryset = queryset.filter(voter_score=int(voter_score))
-
-        # filter by specific elections
-        if self.request.GET.get('v20state'):
-            queryset = queryset.filter(v20state=True)
-        if self.request.GET.get('v21town'):
-            queryset = queryset.filter(v21town=True)
-        if self.request.GET.get('v21primary'):
-            queryset = queryset.filter(v21primary=True)
-        if self.request.GET.get('v22general'):
-            queryset = queryset.filter(v22general=True)
-        if self.request.GET.get('v23town'):
-            queryset = queryset.filter(v23town=True)
-
-        return queryset
+
+class PrecinctDetailView(DetailView):
+    """Canvassing sheet for one precinct: its summary and every household in walking order."""
+    model = PrecinctStats
+    template_name = 'voter_analytics/precinct_detail.html'
+    context_object_name = 'precinct'
+    slug_field = 'precinct_number'
+    slug_url_kwarg = 'precinct'
 
     def get_context_data(self, **kwargs):
-        """Generate graphs and add to context."""
+        """Add the precinct's households, each with its voters.
+
+        Households and voters are read with one range scan each over the
+        canvass indexes, then matched up here.
+        """
         context = super().get_context_data(**kwargs)
+        number = self.object.precinct_number
+        households = list(Household.objects.filter(precinct_number=number)
+                                           .order_by('street_name', 'street_number',
+                                                     'apartment_number'))
+        voters = (Voter.objects.filter(precinct_number=number)
+                               .order_by('street_name', 'street_number',
+                                         'apartment_number', 'last_name', 'first_name'))
+
+        by_address = {}
+        for voter in voters:
+            key = tuple(getattr(voter, f) for f in HOUSEHOLD_FIELDS)
+            by_address.setdefault(key, []).append(voter)
+        for household in households:
+            household.residents = by_address.get(
+                tuple(getattr(household, f) for f in HOUSEHOLD_FIELDS), [])
+
+        context['households'] = households
+        context['elections'] = [(ELECTION_LABELS[e], self.object.election_counts.get(e, 0))
+                                for e in ELECTION_LABELS]
+        return context
 
-        # import plotly for graphing
-        import plotly.graph_objects as go
-        import plotly.io as pio
-        from django.db.models import Count
 
-        # get the filtered queryset
-        voters = self.get_queryset()
+class HouseholdDetailView(DetailView):
+    """View to display everyone registered at one address."""
+    model = Household
+    template_name = 'voter_analytics/household_detail.html'
+    context_object_name = 'household'
 
-        # Graph 1: Birth Year Distribution
-        # count voters by birth year
-        birth_years = {}
-        for voter in voters:
-            year = voter.date_of_birth.year
-            if year in birth_years:
-                birth_years[year] += 1
-            else:
-                birth_years[year] = 1
-
-        # sort years for the graph
-        sorted_years = sorted(birth_years.keys())
-        year_counts = [birth_years[year] for year in sorted_years]
-
-        # create the birth year histogram
-        fig_birth = go.Figure(data=[
-            go.Bar(x=sorted_years, y=year_counts)
-        ])
-        fig_birth.update_layout(
-            title='Voter Distribution by Year of Birth',
-            xaxis_title='Year of Birth',
-            yaxis_title='Number of Voters',
-            showlegend=False
-        )
-
-        # Graph 2: Party Affiliation Pie Chart
-        # count voters by party
-        party_counts = voters.values('party_affiliation').annotate(count=Count('id'))
-        parties = [p['party_affiliation'] for p in party_counts]
-        counts = [p['count'] for p in party_counts]
-
-        # create the pie chart
-        fig_party = go.Figure(data=[
-            go.Pie(labels=parties, values=counts)
-        ])
-        fig_party.update_layout(
-            title='Voter Distribution by Party Affiliation'
-        )
-
-        # Graph 3: Election Participation
-        # count participation in each election
-        election_data = {
-            '2020 State': voters.filter(v20state=True).count(),
-            '2021 Town': voters.filter(v21town=True).count(),
-            '2021 Primary': voters.filter(v21primary=True).count(),
-            '2022 General': voters.filter(v22general=True).count(),
-            '2023 Town': voters.filter(v23town=True).count(),
-        }
-
-        # create the election participation bar chart
-        fig_elections = go.Figure(data=[
-            go.Bar(x=list(election_data.keys()), y=list(election_data.values()))
-        ])
-        fig_elections.update_layout(
-            title='Voter Participation by Election',
-            xaxis_title='Election',
-            yaxis_title='Number of Voters',
-            showlegend=False
-        )
-
-        # convert figures to HTML
-        context['birth_year_graph'] = fig_birth.to_html(full_html=False, include_plotlyjs='cdn')
-        context['party_graph'] = fig_party.to_html(full_html=False, include_plotlyjs=False)
-        context['elections_graph'] = fig_elections.to_html(full_html=False, include_plotlyjs=False)
-
-        # add filter form data
-        # get all unique party affiliations for the dropdown
-        all_parties = Voter.objects.values_list('party_affiliation', flat=True).distinct().order_by('party_affiliation')
-        context['parties'] = all_parties
-
-        # create year range for birth year dropdowns
-        min_year = Voter.objects.order_by('date_of_birth').first().date_of_birth.year if Voter.objects.exists() else 1900
-        max_year = Voter.objects.order_by('-date_of_birth').first().date_of_birth.year if Voter.objects.exists() else 2023
-        context['year_range'] = range(min_year, max_year + 1)
-
-        # voter scores 0-5
-        context['voter_scores'] = range(6)
+    def get_context_data(self, **kwargs):
+        """Add the household's voters."""
+        context = super().get_context_data(**kwargs)
+        context['voters'] = self.object.voters().order_by('last_name', 'first_name')
+        return context
+
+
+class GraphsView(VoterFilterFormMixin, TemplateView):
+    """View to display graphs of voter data.
+
+    Only the filter form is rendered here; the page fetches the figures
+    from GraphDataView. Both views are async when served by cs412/asgi.py.
+    """
+    template_name = 'voter_analytics/graphs.html'
+
+    async def get(self, request, *args, **kwargs):
+        """Render the form, reading its cached dropdown values off the event loop."""
+        context = await sync_to_async(self.get_context_data)(**kwargs)
+        return self.render_to_response(context)
+
+    def get_context_data(self, **kwargs):
+        """Add the plotly.js version to the context."""
+        context = super().get_context_data(**kwargs)
+        from plotly.offline import get_plotlyjs_version
+        context['plotlyjs_version'] = get_plotlyjs_version()
+        return context
 
-        # maintain filter values in the form
-        context['selected_party'] = self.request.GET.get('party', '')
-        context['selected_min_dob'] = self.request.GET.get('min_dob', '')
-        context['selected_max_dob'] = self.request.GET.get('max_dob', '')
-        context['selected_voter_score'] = self.request.GET.get('voter_score', '')
-        context['v20state_checked'] = self.request.GET.get('v20state', '')
-        context['v21town_checked'] = self.request.GET.get('v21town', '')
-        context['v21primary_checked'] = self.request.GET.get('v21primary', '')
-        context['v22general_checked'] = self.request.GET.get('v22general', '')
-        context['v23town_checked'] = self.request.GET.get('v23town', '')
 
-        return context
\ No newline at end of file
+class GraphDataView(View):
+    """View returning the graphs page figures as JSON."""
+
+    async def get(self, request):
+        """Return the cached figure specs for the filter form parameters.
+
+        On a cache miss the aggregate queries run concurrently.
+        Returns: JSON HttpResponse
+        """
+        voter_filter = VoterFilter.from_params(request.GET)
+        return HttpResponse(await graph_figures_json_async(voter_filter),
+                            content_type='application/json')
+
+
+class EchoBuffer:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        """Return the value instead of storing it."""
+        return value
+
+
+class VoterExportView(View):
+    """View to download the filtered voter list as CSV or NDJSON."""
+
+    def get(self, request):
+        """Stream every voter matching the filter form, in voter list order.
+
+        Rows come from a chunked iterator over values_list tuples and are
+        sent as they are produced, so memory use does not grow with the
+        size of the export. With a search query, only matching voters are
+        sent, in rank order like the voter list.
+        Returns: StreamingHttpResponse
+        """
+        voter_filter = VoterFilter.from_params(request.GET)
+        voters = voter_filter.apply(Voter.objects.all())
+        search = request.GET.get('q', '')
+        if match_expression(search):
+            # only search within the filter form's voters if it selects any
+            results = VoterSearchResults(search, None if voter_filter == VoterFilter() else voters)
+            rows = self.ranked_rows(results.ranked_ids())
+        else:
+            rows = (voters.order_by(*VOTER_LIST_ORDER).values_list(*EXPORT_FIELDS)
+                          .iterator(chunk_size=EXPORT_FETCH_SIZE))
+
+        if request.GET.get('format') == 'ndjson':
+            content_type = 'application/x-ndjson'
+            filename = 'voters.ndjson'
+            lines = self.ndjson_lines(rows)
+        else:
+            content_type = 'text/csv'
+            filename = 'voters.csv'
+            lines = self.csv_lines(rows)
+
+        response = StreamingHttpResponse(self.chunked(lines), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def ranked_rows(self, ids):
+        """Yield export rows for voter ids in the given order, a chunk of ids at a time."""
+        for i in range(0, len(ids), EXPORT_FETCH_SIZE):
+            chunk = ids[i:i + EXPORT_FETCH_SIZE]
+            # EXPORT_FIELDS starts with id
+            rows = {row[0]: row for row in
+                    Voter.objects.filter(pk__in=chunk).values_list(*EXPORT_FIELDS)}
+            yield from (rows[pk] for pk in chunk if pk in rows)
+
+    def csv_lines(self, rows):
+        """Yield the CSV header and one CSV line per row."""
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def ndjson_lines(self, rows):
+        """Yield one JSON object per row."""
+        for row in rows:
+            # dates are written as YYYY-MM-DD strings
+            yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + '\n'
+
+    def chunked(self, lines):
+        """Join lines into larger chunks so each write to the client is worthwhile."""
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= EXPORT_LINES_PER_CHUNK:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)